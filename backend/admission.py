@@ -0,0 +1,81 @@
+import math
+import threading
+
+
+class AdmissionGate:
+    """
+    Bounded admission for inference requests in one server process.
+
+    Up to `max_active` requests run at once and up to `max_waiting` more may
+    queue for a slot; anything beyond that is rejected straight away so the
+    caller can answer 503 instead of letting latency pile up. `retry_after()`
+    estimates when a slot should be free from a running average of service time.
+    """
+
+    def __init__(self, max_active, max_waiting, smoothing=0.2):
+        self.max_active = max(1, int(max_active))
+        self.max_waiting = max(0, int(max_waiting))
+        self.smoothing = smoothing
+        self.active = 0
+        self.waiting = 0
+        self.service_seconds = None
+        self._condition = threading.Condition()
+
+    def try_enter(self, timeout=None, cancelled=None):
+        """
+        Takes a slot, waiting in the queue if needed. False when the queue is full,
+        or when the wait gives up: after `timeout` seconds, or once `cancelled()`
+        is true (call wake() when that changes).
+        """
+        with self._condition:
+            if self.active < self.max_active:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_waiting:
+                return False
+            self.waiting += 1
+            try:
+                self._condition.wait_for(
+                    lambda: self.active < self.max_active or (cancelled is not None and cancelled()), timeout)
+            finally:
+                self.waiting -= 1
+            if self.active >= self.max_active or (cancelled is not None and cancelled()):
+                if self.active < self.max_active:
+                    # Pass the wake-up for the free slot on to the next waiter
+                    self._condition.notify()
+                return False
+            self.active += 1
+            return True
+
+    def wake(self):
+        """Wakes the queued requests so they re-check their `cancelled()`."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def leave(self, service_seconds=None):
+        with self._condition:
+            self.active -= 1
+            if service_seconds is not None:
+                if self.service_seconds is None:
+                    self.service_seconds = service_seconds
+                else:
+                    self.service_seconds += self.smoothing * (service_seconds - self.service_seconds)
+            self._condition.notify()
+
+    def retry_after(self):
+        """Whole seconds a rejected client should wait before retrying (at least 1)."""
+        with self._condition:
+            if self.service_seconds is None:
+                return 1
+            backlog = (self.waiting + self.active) / self.max_active
+            return max(1, math.ceil(backlog * self.service_seconds))
+
+    def status(self):
+        with self._condition:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_active": self.max_active,
+                "max_waiting": self.max_waiting
+            }
+
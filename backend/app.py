@@ -1,44 +1,226 @@
+import json
+import logging
 import os
-import io
-import string
-import soundfile as sf
-from flask import Flask, jsonify, request
+import shutil
+import tempfile
+import time
+from functools import partial
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from pydub import AudioSegment
-from transformers import pipeline
+from flask_sock import ConnectionClosed, Sock
+
+from admission import AdmissionGate
+from audio import (
+    PCM_ENCODINGS, PCM_MAX_SAMPLE_RATE, PCM_MIN_SAMPLE_RATE, TARGET_SAMPLE_RATE, VAD_FRAME_MS,
+    VoiceActivityDetector, audio_stats_header, load_speech_array, normalize_audio, pcm_to_float,
+    resample_linear, server_timing_header, speech_stats
+)
+from batching import BatchScheduler
+from bulk_speech import iter_archive, recognize_clips, spool_uploads
+from command_decoding import DEFAULT_COMMAND_BIAS, WHISPER_DECODINGS, CommandDecoding
+from instrumentation import (
+    BATCH_SIZE, CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, RESOLUTIONS, SPEECH_REQUESTS,
+    TIER_REQUESTS, configure_logging, log_event, observe_audio, observe_timings
+)
+from intent_classifier import create_intent_classifier
+from inference_jobs import DEADLINE_EXCEEDED, InferenceExecutor, InferenceJob, JobCancelled
+from intent_engine import IntentEngine
+from models import FAILED, ModelManager, apply_precision, precision_dtype, synthetic_clip
+from pose import evaluate_request
+from tiering import TierRouter
 
 # --- App Initialization ---
+# LOG_LEVEL=DEBUG brings back per-request detail (transcriptions, matches, timings)
+configure_logging(os.environ.get('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger("fitness_coach")
+
 app = Flask(__name__)
+sock = Sock(app)
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:3000", "http://localhost:3001", "http://localhost:3003"]}}) # Support all common React ports
 
 # --- Load AI Models ---
+# Models load concurrently in the background (see models.py) so the server can
+# start accepting requests immediately; /api/ready reports when they are usable.
+
+# INFERENCE_PRECISION picks the CPU inference mode for both models: "fp32" (default),
+# "int8" (dynamic quantization of linear layers) or "bf16". Run precision_report.py
+# to compare accuracy, latency and memory across modes on a local clip set.
+INFERENCE_PRECISION = os.environ.get('INFERENCE_PRECISION', 'fp32')
+
+# WHISPER_DECODING="command" caps, biases and early-stops Whisper's decoding for
+# the command vocabulary (see command_decoding.py); "free" (default) decodes
+# unconstrained text. precision_report.py --decoding free command compares them.
+WHISPER_DECODING = os.environ.get('WHISPER_DECODING', 'free')
+WHISPER_COMMAND_BIAS = float(os.environ.get('WHISPER_COMMAND_BIAS', DEFAULT_COMMAND_BIAS))
+command_decoding = None
 
 # Model 1: Speech-to-Text (OpenAI Whisper)
 # Enhanced configuration for better accuracy
-try:
-    print("Loading Whisper model (this may take a moment on first run)...")
+def load_transcriber(model="openai/whisper-base.en"):
+    global command_decoding
+    from transformers import pipeline
+    if WHISPER_DECODING not in WHISPER_DECODINGS:
+        raise ValueError(f"Unknown Whisper decoding '{WHISPER_DECODING}', expected one of {WHISPER_DECODINGS}")
     # Use chunk_length_s for better accuracy with short commands
     transcriber = pipeline(
         "automatic-speech-recognition", 
-        model="openai/whisper-base.en",
+        model=model,
         chunk_length_s=30,  # Process in 30-second chunks
-        return_timestamps=False  # We don't need timestamps for commands
+        return_timestamps=False,  # We don't need timestamps for commands
+        torch_dtype=precision_dtype(INFERENCE_PRECISION)
+    )
+    transcriber.model = apply_precision(transcriber.model, INFERENCE_PRECISION)
+    if WHISPER_DECODING == 'command':
+        command_decoding = CommandDecoding(transcriber.tokenizer, bias=WHISPER_COMMAND_BIAS)
+    return transcriber
+
+def whisper_generate_kwargs(speech_arrays):
+    # Use temperature parameter for more deterministic results
+    generate_kwargs = {"temperature": 0.0}
+    if command_decoding is not None:
+        generate_kwargs.update(command_decoding.generate_kwargs(speech_arrays))
+    return generate_kwargs
+
+def warm_up_transcriber(model):
+    clip = synthetic_clip()
+    model(clip, generate_kwargs=whisper_generate_kwargs([clip]))
+
+# Model 2: Intent Classification
+# INTENT_CLASSIFIER selects the fallback engine used when no command rule matches:
+# "bart" (Facebook BART Large MNLI zero-shot, one NLI pass per label) or
+# "embedding" (sentence encoder scored against label embeddings computed once at startup)
+INTENT_CLASSIFIER = os.environ.get('INTENT_CLASSIFIER', 'bart')
+
+def load_classifier(engine=INTENT_CLASSIFIER):
+    return create_intent_classifier(engine, precision=INFERENCE_PRECISION)
+
+def warm_up_classifier(model):
+    model("let's move on to the next one")
+
+models = ModelManager()
+models.register('transcriber', load_transcriber, warm_up_transcriber)
+models.register('classifier', load_classifier, warm_up_classifier)
+
+# Smaller models for the lite tier (see Model Tiers below), only loaded under load
+WHISPER_LITE_MODEL = os.environ.get('WHISPER_LITE_MODEL', 'openai/whisper-tiny.en')
+INTENT_LITE_CLASSIFIER = os.environ.get('INTENT_LITE_CLASSIFIER', 'embedding')
+models.register('transcriber_lite', partial(load_transcriber, WHISPER_LITE_MODEL), warm_up_transcriber,
+                lazy=True, size_mb=150)
+if INTENT_LITE_CLASSIFIER != INTENT_CLASSIFIER:
+    models.register('classifier_lite', partial(load_classifier, INTENT_LITE_CLASSIFIER), warm_up_classifier,
+                    lazy=True, size_mb=90)
+
+# Rules first, then the classifier for utterances no rule matches (see intent_engine.py)
+intent_engine = IntentEngine(lambda: models.get('classifier'))
+
+# MODELS_AUTOSTART=0 leaves loading to the caller (e.g. the benchmark harness,
+# which registers stub models before starting the manager)
+if os.environ.get('MODELS_AUTOSTART', '1') != '0':
+    models.start()
+
+# --- Speech Batching ---
+# Clips arriving within SPEECH_BATCH_WINDOW_MS of each other are transcribed in one
+# Whisper forward pass (up to SPEECH_MAX_BATCH clips). Raising the window trades a
+# little latency for larger batches; SPEECH_MAX_BATCH=1 disables batching.
+SPEECH_BATCH_WINDOW_MS = float(os.environ.get('SPEECH_BATCH_WINDOW_MS', 10))
+SPEECH_MAX_BATCH = int(os.environ.get('SPEECH_MAX_BATCH', 8))
+
+def extract_transcription_text(transcription_result):
+    """Normalizes the different return formats of the Whisper pipeline to plain text."""
+    if isinstance(transcription_result, dict):
+        return transcription_result.get('text', '').strip()
+    elif isinstance(transcription_result, list) and len(transcription_result) > 0:
+        # Sometimes returns a list of results
+        first_result = transcription_result[0]
+        if isinstance(first_result, dict):
+            return first_result.get('text', '').strip()
+        return str(first_result).strip()
+    # Fallback for other formats
+    return str(transcription_result).strip()
+
+def transcribe_batch(speech_arrays, transcriber_name='transcriber'):
+    """Runs Whisper over a list of 16kHz mono clips in a single batched call."""
+    transcriber = models.get(transcriber_name)
+    results = transcriber(
+        list(speech_arrays),
+        batch_size=len(speech_arrays),
+        generate_kwargs=whisper_generate_kwargs(speech_arrays)
+    )
+    if len(speech_arrays) == 1 and not isinstance(results, list):
+        results = [results]
+    BATCH_SIZE.observe(len(speech_arrays))
+    log_event(logger, logging.DEBUG, "asr_batch", clips=len(speech_arrays))
+    return [extract_transcription_text(result) for result in results]
+
+# Audio decoder for incoming clips: "auto" (PyAV, falling back to pydub), "pyav" or "pydub"
+AUDIO_DECODER = os.environ.get('AUDIO_DECODER', 'auto')
+
+# Trim leading/trailing silence before ASR and skip Whisper entirely for clips
+# without speech (TRIM_SILENCE=0 feeds the whole clip, as before)
+TRIM_SILENCE = os.environ.get('TRIM_SILENCE', '1') != '0'
+
+# One batcher per transcriber tier, so a batch never mixes models
+speech_batchers = {
+    name: BatchScheduler(
+        partial(transcribe_batch, transcriber_name=name),
+        max_batch_size=SPEECH_MAX_BATCH,
+        window_ms=SPEECH_BATCH_WINDOW_MS,
+        name=thread_name
     )
-    print("Whisper model loaded successfully.")
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load Whihisper model: {e}")
-    transcriber = None
-
-# Model 2: Intent Classification (Facebook BART Large MNLI - Pre-trained)
-# BART-large-mnli is specifically trained for natural language inference and classification
-# Better performance for intent recognition with your hardware specs
-try:
-    print("Loading Intent Classification model (BART Large MNLI - Pre-trained)...")
-    classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    print("Intent classification model loaded successfully.")
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load intent classification model: {e}")
-    classifier = None
+    for name, thread_name in (('transcriber', "whisper-batcher"), ('transcriber_lite', "whisper-lite-batcher"))
+}
+speech_batcher = speech_batchers['transcriber']
+
+# --- Admission Control ---
+# At most SPEECH_MAX_CONCURRENCY speech requests are processed at once per server
+# process, with up to SPEECH_MAX_QUEUE more waiting for a slot. Beyond that requests
+# are turned away with 503 + Retry-After instead of queueing up latency.
+SPEECH_MAX_CONCURRENCY = int(os.environ.get('SPEECH_MAX_CONCURRENCY', SPEECH_MAX_BATCH))
+SPEECH_MAX_QUEUE = int(os.environ.get('SPEECH_MAX_QUEUE', 16))
+
+speech_gate = AdmissionGate(SPEECH_MAX_CONCURRENCY, SPEECH_MAX_QUEUE)
+
+# --- Deadlines and Cancellation ---
+# /api/speech runs each command as an InferenceJob on inference_executor (see
+# inference_jobs.py) and answers 504 once the job's deadline passes. Clients may
+# send X-Request-Deadline-Ms (their time budget; default SPEECH_DEADLINE_MS, 0 for
+# none) and X-Client-Session: a newer command of the same session cancels the
+# older one, which answers 409. Cancelled work stops at the next pipeline stage.
+SPEECH_DEADLINE_MS = float(os.environ.get('SPEECH_DEADLINE_MS', 30000))
+
+# Cancelled jobs may still finish the stage they are in after their request has
+# answered, so the pool has headroom beyond the admission limit
+inference_executor = InferenceExecutor(2 * SPEECH_MAX_CONCURRENCY, name="inference")
+
+# --- Model Tiers ---
+# With MODEL_TIERING=1 each voice command is served by the "full" tier (Whisper
+# base + INTENT_CLASSIFIER), the "lite" tier (WHISPER_LITE_MODEL + INTENT_LITE_CLASSIFIER)
+# once TIER_QUEUE_DEPTH requests wait for a slot or the p95 of the last 30s
+# exceeds TIER_P95_MS, or the "rules" tier (lite Whisper, no classifier fallback)
+# at twice either threshold. Lite models load on first use, stay within
+# TIER_RAM_BUDGET_MB (0: no limit) together with the full ones, and are unloaded
+# after TIER_IDLE_UNLOAD_S without use. See tiering.py.
+MODEL_TIERING = os.environ.get('MODEL_TIERING', '0') == '1'
+
+tier_router = TierRouter(
+    models,
+    speech_gate,
+    stages={
+        "transcriber": {"full": 'transcriber', "lite": 'transcriber_lite', "rules": 'transcriber_lite'},
+        "classifier": {
+            "full": 'classifier',
+            "lite": 'classifier_lite' if INTENT_LITE_CLASSIFIER != INTENT_CLASSIFIER else 'classifier',
+            "rules": None
+        }
+    },
+    queue_depth=int(os.environ.get('TIER_QUEUE_DEPTH', max(1, SPEECH_MAX_QUEUE // 4))),
+    p95_ms=float(os.environ.get('TIER_P95_MS', 2000)),
+    ram_budget_mb=float(os.environ.get('TIER_RAM_BUDGET_MB', 0)),
+    idle_unload_s=float(os.environ.get('TIER_IDLE_UNLOAD_S', 300)),
+    enabled=MODEL_TIERING
+)
 
 # --- Define Intents and Entities ---
 # More specific and balanced intent labels for better BART classification
@@ -50,36 +232,59 @@ INTENT_LABELS = [
     "take a rest break", "add rest time", "need a break", "pause workout"
 ]
 
-# Expanded exercise entities with variations
-EXERCISE_ENTITIES = [
-    'plank', 'planks', 'plank exercise',
-    'push up', 'push ups', 'pushup', 'pushups', 'press up', 'press ups',
-    'squat', 'squats', 'squat exercise',
-    'bridge', 'bridges', 'bridge pose', 'glute bridge',
-    'bird dog', 'bird dogs', 'birddog', 'bird-dog',
-    'high knees', 'high knee', 'knee ups', 'knee raise',
-    'lunges', 'lunge', 'lung', 'forward lunge',
-    'superman', 'supermans', 'superman pose', 'superman exercise',
-    'wall sit', 'wall sits', 'wall squat', 'wallsit'
-]
+# --- API Routes ---
+def timed_response(payload, timings, audio_stats=None):
+    """
+    JSON response carrying the per-stage timings in a Server-Timing header and,
+    when given, how much of the clip was speech in an X-Audio-Stats header.
+    """
+    observe_timings(timings)
+    log_event(logger, logging.DEBUG, "stage_timings", **timings)
+    response = jsonify(payload)
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    if audio_stats is not None:
+        observe_audio(audio_stats)
+        log_event(logger, logging.DEBUG, "audio_stats", **audio_stats)
+        response.headers['X-Audio-Stats'] = audio_stats_header(audio_stats)
+    return response
 
-# Enhanced routine entities with more variations
-ROUTINE_ENTITIES = {
-    "core strength": "core_strength",
-    "core workout": "core_strength", 
-    "core": "core_strength",
-    "abs workout": "core_strength",
-    "lower body power": "lower_body",
-    "lower body": "lower_body",
-    "leg workout": "lower_body",
-    "legs": "lower_body",
-    "upper body and posture": "upper_body",
-    "upper body": "upper_body",
-    "arms workout": "upper_body",
-    "arms": "upper_body"
-}
+def models_unavailable_response():
+    """503 for requests that arrive before the models are ready (or after one failed)."""
+    response = jsonify({
+        "error": "An AI model is not available. The server may be starting up.",
+        "models": models.status()
+    })
+    if models.overall_state() != FAILED:
+        response.headers['Retry-After'] = '5'
+    return response, 503
+
+def cancelled_response(reason):
+    """504 for commands that ran out of time, 409 for ones replaced by a newer command of the same session."""
+    if reason == DEADLINE_EXCEEDED:
+        return jsonify({"error": "The command could not be processed in time.", "reason": reason}), 504
+    return jsonify({"error": "A newer command from this session replaced this one.", "reason": reason}), 409
+
+def speech_job():
+    """The InferenceJob for this request, from its headers; ValueError for a malformed deadline."""
+    deadline = request.headers.get('X-Request-Deadline-Ms')
+    if deadline is None:
+        deadline_ms = SPEECH_DEADLINE_MS
+    else:
+        try:
+            deadline_ms = float(deadline)
+        except ValueError:
+            deadline_ms = 0.0
+        if not deadline_ms > 0:
+            raise ValueError("X-Request-Deadline-Ms must be a positive number of milliseconds.")
+    return InferenceJob(session=request.headers.get('X-Client-Session') or None, deadline_ms=deadline_ms or None)
+
+def overloaded_response(gate=None):
+    """503 for requests turned away because the queue of `gate` (default: speech_gate) is full."""
+    gate = gate or speech_gate
+    response = jsonify({"error": "The server is busy. Please retry shortly.", "queue": gate.status()})
+    response.headers['Retry-After'] = str(gate.retry_after())
+    return response, 503
 
-# --- API Routes ---
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint to confirm the server is running."""
@@ -88,14 +293,175 @@ def root():
         "status": "healthy",
         "endpoints": {
             "health": "/api/health",
-            "speech": "/api/speech (POST)"
+            "ready": "/api/ready",
+            "metrics": "/api/metrics",
+            "intent": "/api/intent (POST)",
+            "pose": "/api/pose/evaluate (POST)",
+            "speech": "/api/speech (POST)",
+            "speech_batch": "/api/speech/batch (POST)",
+            "speech_stream": "/api/speech/stream (WebSocket)"
         }
     }), 200
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """A simple endpoint to confirm the server is running."""
-    return jsonify({"status": "healthy"}), 200
+    """
+    Liveness endpoint: confirms the server is running and reports the state and
+    load/warm-up timings of each model.
+    """
+    return jsonify({
+        "status": "healthy",
+        "models_state": models.overall_state(),
+        "models": models.status(),
+        "tiers": tier_router.status()
+    }), 200
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 once every model is loaded and warmed up, 503 before that."""
+    ready = models.is_ready()
+    return jsonify({"ready": ready, "models_state": models.overall_state(), "models": models.status()}), 200 if ready else 503
+
+def interpret_speech(speech_array, timings, tier, job=None):
+    """
+    Transcribes a decoded 16kHz mono clip and resolves it to a command with the
+    models of `tier` (see tier_router). Stage timings are added to `timings`;
+    returns the response payload. With a `job`, stops early once it is cancelled.
+    """
+    # --- Step 2: Enhanced Speech-to-Text with Whisper ---
+    # Clips from concurrent requests are batched into a single Whisper call
+    asr_start = time.perf_counter()
+    batcher = speech_batchers[tier.transcriber]
+    if job is None:
+        transcribed_text = batcher.run(speech_array)
+    else:
+        transcribed_text = job.wait(batcher.submit(speech_array))
+    timings['asr'] = (time.perf_counter() - asr_start) * 1000.0
+    
+    log_event(logger, logging.DEBUG, "transcription", text=transcribed_text)
+    if job is not None:
+        job.check()
+
+    # --- Steps 3-4: Rules, Classifier Fallback, Normalization and Entities ---
+    return intent_engine.resolve_one(transcribed_text, timings, classifier=tier.classifier)
+
+def transcribe_many(speech_arrays):
+    """Transcribes several clips through the shared batcher, so they fill Whisper batches."""
+    futures = [speech_batcher.submit(speech_array) for speech_array in speech_arrays]
+    return [future.result() for future in futures]
+
+# Decode threads per bulk request (see recognize_batch)
+BULK_DECODE_WORKERS = int(os.environ.get('BULK_DECODE_WORKERS', 4))
+# Largest clip accepted from a bulk zip archive once extracted
+BULK_MAX_CLIP_BYTES = int(float(os.environ.get('BULK_MAX_CLIP_MB', 25)) * 1024 * 1024)
+
+def recognize_batch(clips, chunk_size=None):
+    """
+    Recognizes many clips in one go: takes an iterable of (name, audio bytes) and
+    lazily yields {"clip": name, ...} results in the /api/speech response shape, in
+    input order. Usable from Python for offline scoring, e.g.
+
+        from app import recognize_batch
+        from bulk_speech import iter_archive
+        for result in recognize_batch(iter_archive("clips.zip")): ...
+    """
+    if not models.wait('transcriber', 'classifier'):
+        raise RuntimeError(f"An AI model is not available: {models.status()}")
+    return recognize_clips(
+        clips,
+        decode=partial(load_speech_array, decoder=AUDIO_DECODER, trim=TRIM_SILENCE),
+        transcribe=transcribe_many,
+        resolve=intent_engine.resolve,
+        chunk_size=chunk_size or SPEECH_MAX_BATCH,
+        decode_workers=BULK_DECODE_WORKERS
+    )
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Scrape endpoint exposing the instrumentation counters and histograms (Prometheus text format)."""
+    return REGISTRY.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+# Largest number of utterances accepted by one /api/intent request
+INTENT_MAX_TEXTS = int(os.environ.get('INTENT_MAX_TEXTS', 256))
+
+# Text intents take milliseconds, so they get their own slots rather than
+# queueing behind Whisper transcriptions on speech_gate
+INTENT_MAX_CONCURRENCY = int(os.environ.get('INTENT_MAX_CONCURRENCY', 4))
+INTENT_MAX_QUEUE = int(os.environ.get('INTENT_MAX_QUEUE', 8))
+intent_gate = AdmissionGate(INTENT_MAX_CONCURRENCY, INTENT_MAX_QUEUE)
+
+@app.route('/api/intent', methods=['POST'])
+def recognize_intent():
+    """
+    Text-only variant of /api/speech for clients that already have a transcription
+    (browser speech APIs, chat input, test suites). Accepts {"text": "..."} and
+    answers in the /api/speech response shape, or {"texts": [...]} and answers
+    {"results": [...]} in the same order. Rule misses are classified in one batch.
+    """
+    usage = 'Send {"text": "..."} or {"texts": ["...", ...]}.'
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({"error": usage}), 400
+    single = "texts" not in body
+    texts = [body.get("text")] if single else body["texts"]
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": usage}), 400
+    if len(texts) > INTENT_MAX_TEXTS:
+        return jsonify({"error": f"At most {INTENT_MAX_TEXTS} texts per request."}), 400
+    if not models.is_ready('classifier'):
+        return models_unavailable_response()
+    if not intent_gate.try_enter():
+        SPEECH_REQUESTS.inc(route="intent", status=503)
+        return overloaded_response(intent_gate)
+
+    request_start = time.perf_counter()
+    try:
+        timings = {}
+        tier = tier_router.select()
+        try:
+            results = intent_engine.resolve([text.strip() for text in texts], timings, classifier=tier.classifier)
+        finally:
+            tier_router.release(tier)
+        REQUEST_SECONDS.observe(time.perf_counter() - request_start, route="intent")
+        SPEECH_REQUESTS.inc(route="intent", status=200)
+        TIER_REQUESTS.inc(tier=tier.name)
+        if single:
+            return timed_response(dict(results[0], tier=tier.name), timings)
+        return timed_response({"results": results, "tier": tier.name}, timings)
+
+    except Exception as e:
+        logger.exception("Intent request failed")
+        SPEECH_REQUESTS.inc(route="intent", status=500)
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        intent_gate.leave(time.perf_counter() - request_start)
+
+# Largest number of sessions accepted by one /api/pose/evaluate request
+POSE_MAX_SESSIONS = int(os.environ.get('POSE_MAX_SESSIONS', 1000))
+
+@app.route('/api/pose/evaluate', methods=['POST'])
+def evaluate_pose():
+    """
+    Re-scores recorded workout sessions with the same form rules as the browser
+    (see pose.py). Accepts one session {"exercise", "keypoints": frames x 17 x
+    [x, y, score], optional "stage", "rep_count", "fps", "per_frame"} or
+    {"sessions": [...]}, which is answered with {"results": [...]}.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": 'Send a session {"exercise": ..., "keypoints": [...]} or {"sessions": [...]}.'}), 400
+    single = "sessions" not in body
+    sessions = [body] if single else body["sessions"]
+    if not isinstance(sessions, list) or len(sessions) > POSE_MAX_SESSIONS:
+        return jsonify({"error": f"Send a list of at most {POSE_MAX_SESSIONS} sessions."}), 400
+
+    start = time.perf_counter()
+    try:
+        results = [evaluate_request(session) for session in sessions]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return timed_response(results[0] if single else {"results": results}, {'pose': (time.perf_counter() - start) * 1000.0})
 
 @app.route('/api/speech', methods=['POST'])
 def recognize_speech():
@@ -103,332 +469,249 @@ def recognize_speech():
     This is the main AI orchestration endpoint.
     It receives an audio blob, transcribes it to text, and classifies the user's intent.
     """
-    if not transcriber or not classifier:
-        return jsonify({"error": "An AI model is not available. The server may be starting up."}), 503
+    if not models.is_ready('transcriber', 'classifier'):
+        return models_unavailable_response()
+
+    try:
+        job = speech_job()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Claimed before queueing for admission, so an older command of this
+    # session that is still waiting for a slot is replaced right away
+    try:
+        admitted = inference_executor.admit(job, speech_gate)
+    except JobCancelled as e:
+        response, status = cancelled_response(e.reason)
+        SPEECH_REQUESTS.inc(route="speech", status=status)
+        log_event(logger, logging.INFO, "speech_cancelled", reason=e.reason, session=job.session, queued=True)
+        return response, status
+    if not admitted:
+        SPEECH_REQUESTS.inc(route="speech", status=503)
+        log_event(logger, logging.WARNING, "speech_rejected", **speech_gate.status())
+        return overloaded_response()
 
     audio_blob = request.data
-    print(f"[DEBUG] Received audio blob, size: {len(audio_blob)} bytes")
+    log_event(logger, logging.DEBUG, "speech_request", bytes=len(audio_blob), session=job.session)
+    request_start = time.perf_counter()
     
     try:
-        # --- Step 1: Enhanced Audio Conversion ---
-        # Convert to optimal format for Whisper with noise reduction
-        audio = AudioSegment.from_file(io.BytesIO(audio_blob))
-        
-        # Normalize audio levels for better recognition
-        audio = audio.normalize()
-        
-        # Convert to mono 16kHz (optimal for Whisper)
-        audio = audio.set_channels(1).set_frame_rate(16000)
-        
-        # Apply light noise reduction if audio is too quiet
-        if audio.dBFS < -30:  # If audio is very quiet
-            audio = audio + (15 - audio.dBFS)  # Boost volume
-        
-        wav_buffer = io.BytesIO()
-        audio.export(wav_buffer, format="wav")
-        wav_buffer.seek(0)
-        
-        speech_array, sample_rate = sf.read(wav_buffer)
-
-        # --- Step 2: Enhanced Speech-to-Text with Whisper ---
-        # Use temperature parameter for more deterministic results
-        transcription_result = transcriber(
-            speech_array,
-            generate_kwargs={"temperature": 0.0}  # More deterministic output
-        )
-        
-        # Handle different return formats from Whisper pipeline
-        if isinstance(transcription_result, dict):
-            transcribed_text = transcription_result.get('text', '').strip()
-        elif isinstance(transcription_result, list) and len(transcription_result) > 0:
-            # Sometimes returns a list of results
-            first_result = transcription_result[0]
-            if isinstance(first_result, dict):
-                transcribed_text = first_result.get('text', '').strip()
-            else:
-                transcribed_text = str(first_result).strip()
-        else:
-            # Fallback for other formats
-            transcribed_text = str(transcription_result).strip()
-        
-        print(f"[DEBUG] WHISPER TRANSCRIPTION: '{transcribed_text}'")
-        
-        if not transcribed_text:
-            print("[DEBUG] No transcription received, returning UNKNOWN")
-            return jsonify({"intent": "UNKNOWN", "entity": None, "transcription": ""})
-
-        # --- Step 3: Enhanced Intent Classification ---
-        # Improved single word and phrase matching
-        text_lower = transcribed_text.lower().strip()
-        
-        # Remove punctuation for better matching
-        text_clean = text_lower.translate(str.maketrans('', '', string.punctuation))
-        
-        print(f"[DEBUG] Processing text: '{text_lower}' -> cleaned: '{text_clean}'")
-        
-        # Enhanced single word commands
-        single_word_mapping = {
-            "start": "start workout",
-            "begin": "start workout", 
-            "go": "start workout",
-            "workout": "start workout",
-            "stop": "stop workout",
-            "end": "stop workout",
-            "quit": "stop workout", 
-            "done": "stop workout",
-            "finish": "stop workout",
-            "skip": "skip exercise",
-            "next": "skip exercise",
-            "pass": "skip exercise",
-            "rest": "add rest",
-            "break": "add rest",
-            "pause": "add rest",
-            # Exercise names
-            "plank": "switch exercise",
-            "planks": "switch exercise",
-            "pushup": "switch exercise", 
-            "pushups": "switch exercise",
-            "push up": "switch exercise",
-            "push ups": "switch exercise",
-            "squat": "switch exercise",
-            "squats": "switch exercise",
-            "bridge": "switch exercise",
-            "bridges": "switch exercise",
-            "superman": "switch exercise",
-            "lunge": "switch exercise",
-            "lunges": "switch exercise",
-            "wall sit": "switch exercise",
-            "high knees": "switch exercise"
-        }
-        
-        # Check for direct matches first (using cleaned text)
-        best_intent = None
-        entity = None
-        
-        if text_clean in single_word_mapping:
-            best_intent = single_word_mapping[text_clean]
-            print(f"[DEBUG] DIRECT MATCH found: '{text_clean}' -> '{best_intent}'")
-            
-            # Set entity for exercise switches
-            if best_intent == "switch exercise":
-                exercise_name_mapping = {
-                    "plank": "Plank", "planks": "Plank",
-                    "pushup": "Push-up", "pushups": "Push-up", 
-                    "push up": "Push-up", "push ups": "Push-up",
-                    "squat": "Squat", "squats": "Squat",
-                    "bridge": "Bridge", "bridges": "Bridge", 
-                    "superman": "Superman",
-                    "lunge": "Lunges", "lunges": "Lunges",
-                    "wall sit": "Wall-sit", "wall seat": "Wall-sit", "wall seed": "Wall-sit", "wall seet": "Wall-sit",
-                    "high knees": "High Knees", "high knee": "High Knees", "hi knees": "High Knees", "hi knee": "High Knees"
-                    
-                }
-                entity = exercise_name_mapping.get(text_clean)
-        
-        # If no direct match, try phrase matching and exercise detection
-        if not best_intent:
-            print(f"[DEBUG] No direct match, trying phrase matching and BART classification...")
-            # Check for common phrases first
-            if any(phrase in text_lower for phrase in ["start workout", "begin workout", "start exercise"]):
-                best_intent = "start workout"
-            elif any(phrase in text_lower for phrase in ["stop workout", "end workout", "quit workout", "stop exercise", "end exercise"]):
-                best_intent = "stop workout"
-            elif any(phrase in text_lower for phrase in ["skip exercise", "next exercise"]):
-                best_intent = "skip exercise"
-            elif any(phrase in text_lower for phrase in [
-                "need rest", "need a rest", "i need rest", "i need a rest",
-                "take a rest", "need a break", "i need a break", "need to rest", "need to take a rest",
-                "want to rest", "want a break", "have a rest", "take a break"
-            ]):
-                best_intent = "stop workout"
-            elif any(phrase in text_lower for phrase in ["add rest", "take rest"]):
-                best_intent = "add rest"
-            else:
-                # Check if it's an exercise name that wasn't caught by direct matching
-                exercise_keywords = ["plank", "squat", "pushup", "push up", "bridge", "superman", "lunge", "wall sit", "high knee"]
-                
-                # Also check for common misheard words
-                exercise_variations = {
-                    "clank": "plank",  # Common mishearing
-                    "bank": "plank",  # Common mishearing
-                    "blank": "plank",  # Common mishearing
-                    "plant": "plank",  # Common mishearing
-                    "squad": "squat",  # Common mishearing
-                    "what": "squat",  # Common mishearing
-                    "squid": "squat",  # Common mishearing
-                    "push": "pushup",  # Shortened form
-                    "pushed": "pushup",  # Past tense
-                    "brush": "pushup",  # Common mishearing
-                    "lunch": "lunge",  # Common mishearing
-                    "launch": "lunge",  # Common mishearing
-                    "lung": "lunge",  # Shortened form
-                    "super": "superman",  # Shortened form
-                    "supa": "superman",  # Common mishearing
-                    "supreme": "superman",  # Common mishearing
-                    "wall seat": "wall sit",  # Common mishearing
-                    "wall seed": "wall sit",  # Common mishearing
-                    "wall seet": "wall sit",  # Common mishearing
-                }
-                
-                # First check for direct keyword match
-                matched_keyword = None
-                for keyword in exercise_keywords:
-                    if keyword in text_clean:
-                        matched_keyword = keyword
-                        break
-                
-                # If no direct match, check for variations/mishearings
-                if not matched_keyword:
-                    for variation, actual in exercise_variations.items():
-                        if variation in text_clean:
-                            matched_keyword = actual
-                            break
-                
-                if matched_keyword:
-                    best_intent = "switch exercise"
-                    # Set the entity for exercise switching
-                    exercise_name_mapping = {
-                        "plank": "Plank",
-                        "squat": "Squat", 
-                        "pushup": "Push-up", "push up": "Push-up",
-                        "bridge": "Bridge", 
-                        "superman": "Superman",
-                        "lunge": "Lunges",
-                        "wall sit": "Wall-sit",
-                        "high knee": "High Knees"
-                    }
-                    entity = exercise_name_mapping.get(matched_keyword, matched_keyword.title())
-                
-                # If still no match, try BART classification as last resort
-                if not best_intent:
-                    try:
-                        # Give BART better context by providing the full sentence with context
-                        context_text = f"User said: '{transcribed_text}' during a fitness workout session"
-                        
-                        # Use more specific labels that are less likely to default to rest
-                        classification_labels = [
-                            "switch to exercise", "change to exercise",
-                            "start workout session", "begin workout", 
-                            "stop workout session", "end workout",
-                            "skip current exercise", "next exercise",
-                            "take a rest break", "need rest", "want rest", "request break"
-                        ]
-                        
-                        intent_result = classifier(context_text, classification_labels)
-                        print(f"[DEBUG] BART INPUT: '{context_text}'")
-                        print(f"[DEBUG] BART RESULT: {intent_result}")
-                        
-                        if isinstance(intent_result, dict) and 'labels' in intent_result and intent_result['labels']:
-                            bart_result = intent_result['labels'][0]
-                            confidence_score = intent_result['scores'][0] if 'scores' in intent_result else 0.0
-                            
-                            print(f"[DEBUG] BART CLASSIFICATION: '{bart_result}' (confidence: {confidence_score:.3f})")
-                            
-                            # Only accept BART result if confidence is reasonable
-                            if confidence_score > 0.3:  # Require at least 30% confidence
-                                # Map BART results back to our standard intents
-                                bart_mapping = {
-                                    "switch to exercise": "switch exercise",
-                                    "change to exercise": "switch exercise", 
-                                    "start workout session": "start workout",
-                                    "begin workout": "start workout",
-                                    "stop workout session": "stop workout",
-                                    "end workout": "stop workout",
-                                    "skip current exercise": "skip exercise",
-                                    "next exercise": "skip exercise",
-                                    "take a rest break": "add rest",
-                                    "need rest": "add rest",
-                                    "want rest": "add rest",
-                                    "request break": "add rest"
-                                }
-                                best_intent = bart_mapping.get(bart_result, "UNKNOWN")
-                                print(f"[DEBUG] MAPPED BART RESULT: '{best_intent}'")
-                            else:
-                                print(f"[DEBUG] BART CONFIDENCE TOO LOW ({confidence_score:.3f}), setting to UNKNOWN")
-                                best_intent = "UNKNOWN"
-                        else:
-                            best_intent = "UNKNOWN"
-                    except Exception as e:
-                        best_intent = "UNKNOWN"
-        
-        # --- Step 4: Intent Normalization ---
-        # Normalize intent names for consistency
-        intent_mapping = {
-            "begin workout": "start workout",
-            "start exercise": "start workout", 
-            "end workout": "stop workout", 
-            "finish workout": "stop workout",
-            "change exercise": "switch exercise",
-            "do exercise": "switch exercise",
-            "next exercise": "switch exercise",
-            "switch to exercise": "switch exercise",
-            "change to exercise": "switch exercise",
-            "start this exercise": "switch exercise",
-            "do this exercise": "switch exercise",
-            "pass": "skip exercise", 
-            "next": "skip exercise",
-            "move on": "skip exercise",
-            "skip current exercise": "skip exercise",
-            "move to next exercise": "skip exercise",
-            "take rest": "add rest",
-            "break": "add rest",
-            "pause": "add rest",
-            "wait": "add rest",
-            "take a rest break": "add rest",
-            "need rest": "add rest",
-            "need a break": "add rest",
-            "begin routine": "start routine",
-            "do routine": "start routine"
-        }
-        
-        # Normalize the intent
-        normalized_intent = intent_mapping.get(best_intent, best_intent)
-        
-        # If no entity was set yet and this is a switch exercise command, try to extract it
-        if normalized_intent == "switch exercise" and not entity:
-            # Try to find exercise name in the transcribed text
-            for exercise in EXERCISE_ENTITIES:
-                if exercise.lower() in text_lower:
-                    # Convert to proper format (e.g., "push up" -> "Push-up")
-                    exercise_name_mapping = {
-                        "plank": "Plank", "planks": "Plank", "plank exercise": "Plank",
-                        "push up": "Push-up", "push ups": "Push-up", "pushup": "Push-up", "pushups": "Push-up",
-                        "squat": "Squat", "squats": "Squat", "squat exercise": "Squat",
-                        "bridge": "Bridge", "bridges": "Bridge", "bridge pose": "Bridge", "glute bridge": "Bridge",
-                        "bird dog": "Bird-dog", "bird dogs": "Bird-dog", "birddog": "Bird-dog", "bird-dog": "Bird-dog",
-                        "high knees": "High Knees", "high knee": "High Knees", "knee ups": "High Knees",
-                        "lunges": "Lunges", "lunge": "Lunges", "lung": "Lunges",
-                        "superman": "Superman", "supermans": "Superman", "superman pose": "Superman",
-                        "wall sit": "Wall-sit", "wall sits": "Wall-sit",  "wallsit": "Wall-sit"
-                    }
-                    entity = exercise_name_mapping.get(exercise.lower(), exercise.title())
-                    break
-                    
-        elif normalized_intent in ["start routine", "begin routine", "do routine"]:
-            # Enhanced routine matching
-            routine_labels = list(ROUTINE_ENTITIES.keys())
-            
-            # Check for direct matches first
-            for routine_phrase in ROUTINE_ENTITIES:
-                if routine_phrase.lower() in text_lower:
-                    entity = ROUTINE_ENTITIES[routine_phrase]
-                    break
-
-        # --- Step 5: Format and Return the Final Command ---
-        response = {
-            "intent": normalized_intent.upper().replace(" ", "_"),
-            "entity": entity,
-            "transcription": transcribed_text,
-            "confidence": "high" if text_clean in ["start", "stop", "skip", "plank", "squat", "pushup", "bridge"] else "medium"
-        }
-        
-        print(f"[DEBUG] FINAL RESPONSE: {response}")
-        return jsonify(response)
+        # The pipeline runs on the inference executor; this thread only waits for
+        # the result until the deadline
+        response, timings, audio_stats = inference_executor.run(job, partial(recognize_clip, audio_blob, request_start))
+        REQUEST_SECONDS.observe(time.perf_counter() - request_start, route="speech")
+        SPEECH_REQUESTS.inc(route="speech", status=200)
+        return timed_response(response, timings, audio_stats)
+
+    except JobCancelled as e:
+        response, status = cancelled_response(e.reason)
+        SPEECH_REQUESTS.inc(route="speech", status=status)
+        log_event(logger, logging.INFO, "speech_cancelled", reason=e.reason, session=job.session)
+        return response, status
 
     except Exception as e:
+        logger.exception("Speech request failed")
+        SPEECH_REQUESTS.inc(route="speech", status=500)
         return jsonify({"error": str(e)}), 500
 
+    finally:
+        speech_gate.leave(time.perf_counter() - request_start)
+
+def recognize_clip(audio_blob, request_start, job):
+    """The /api/speech pipeline for one clip, run as `job` on the inference executor."""
+    # --- Step 1: Audio Decoding ---
+    # Decode straight to a 16kHz mono float32 array (optimal for Whisper), cut
+    # leading/trailing silence, then normalize what is left
+    speech_array, timings, audio_stats = load_speech_array(audio_blob, decoder=AUDIO_DECODER, trim=TRIM_SILENCE)
+
+    # Nothing but silence or background noise: don't spend a Whisper pass on it
+    if speech_array.size == 0:
+        RESOLUTIONS.inc(path="no_speech")
+        return {"intent": "UNKNOWN", "entity": None, "transcription": "", "tier": tier_router.level()}, timings, audio_stats
+
+    job.check()
+    tier = tier_router.select()
+    try:
+        response = dict(interpret_speech(speech_array, timings, tier, job), tier=tier.name)
+    finally:
+        tier_router.release(tier)
+    TIER_REQUESTS.inc(tier=tier.name)
+    tier_router.observe(time.perf_counter() - request_start)
+    return response, timings, audio_stats
+
+def request_clips():
+    """
+    The clips of a bulk request (a zip body, a zip in the "archive" field, or
+    multipart files) and the temporary file they are read from. Everything is
+    spooled to that file first: the request and its uploads are closed before
+    the streamed response reads the clips.
+    """
+    spool = tempfile.TemporaryFile()
+    if request.mimetype in ('application/zip', 'application/x-zip-compressed') or 'archive' in request.files:
+        source = request.stream if 'archive' not in request.files else request.files['archive'].stream
+        shutil.copyfileobj(source, spool)
+        return iter_archive(spool, max_clip_bytes=BULK_MAX_CLIP_BYTES), spool
+    return spool_uploads((upload for _, upload in request.files.items(multi=True)), spool), spool
+
+@app.route('/api/speech/batch', methods=['POST'])
+def recognize_speech_batch():
+    """
+    Bulk variant of /api/speech for replaying many recorded clips in one request.
+    Clips are sent as multipart files or as a zip archive (an application/zip body,
+    or a multipart field named "archive"); either way they are read one at a time
+    as the batch needs them. Results stream back as NDJSON, one line per clip in
+    input order, in the /api/speech response shape plus the clip name.
+    """
+    if not models.is_ready('transcriber', 'classifier'):
+        return models_unavailable_response()
+    if request.mimetype not in ('application/zip', 'application/x-zip-compressed') and not request.files:
+        return jsonify({"error": "Send audio clips as multipart files or a zip archive."}), 400
+
+    # The whole bulk request holds a single admission slot
+    if not speech_gate.try_enter():
+        SPEECH_REQUESTS.inc(route="speech_batch", status=503)
+        return overloaded_response()
+
+    spool = None
+    try:
+        clips, spool = request_clips()
+        results = recognize_batch(clips)
+    except Exception as e:
+        speech_gate.leave()
+        if spool is not None:
+            spool.close()
+        logger.exception("Bulk speech request failed")
+        SPEECH_REQUESTS.inc(route="speech_batch", status=400)
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        try:
+            for result in results:
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            # The status line is long gone: report the failure as a last line
+            logger.exception("Bulk speech request failed while streaming")
+            SPEECH_REQUESTS.inc(route="speech_batch", status=500)
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        SPEECH_REQUESTS.inc(route="speech_batch", status=200)
+
+    def close():
+        speech_gate.leave()
+        spool.close()
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(close)
+    return response
+
+def stream_format(control, sample_rate, encoding):
+    """(sample_rate, encoding) from a stream's JSON control message; ValueError for unsupported values."""
+    if not isinstance(control, dict):
+        raise ValueError('Control messages must be JSON objects, e.g. {"sample_rate": 16000}.')
+    sample_rate = control.get("sample_rate", sample_rate)
+    if isinstance(sample_rate, bool) or not isinstance(sample_rate, int) \
+            or not PCM_MIN_SAMPLE_RATE <= sample_rate <= PCM_MAX_SAMPLE_RATE:
+        raise ValueError(f"sample_rate must be an integer from {PCM_MIN_SAMPLE_RATE} to {PCM_MAX_SAMPLE_RATE}.")
+    encoding = control.get("encoding", encoding)
+    if encoding not in PCM_ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(PCM_ENCODINGS)}.")
+    return sample_rate, encoding
+
+@sock.route('/api/speech/stream')
+def stream_speech(ws):
+    """
+    Streaming variant of /api/speech over a WebSocket.
+
+    The client may first send a JSON text message with {"sample_rate": ..., "encoding":
+    "pcm_s16le" | "pcm_f32le"} (defaults: 16000, pcm_s16le; sample rates from 8000 to
+    96000 are accepted, anything else is answered with an error), then raw mono PCM frames
+    as binary messages while recording. Voice activity detection runs as frames
+    arrive; as soon as the end of speech is detected the utterance is transcribed
+    and a single JSON message in the /api/speech response shape is sent back.
+    Sending {"event": "end"} finalizes immediately (e.g. when recording stops).
+    """
+    if not models.is_ready('transcriber', 'classifier'):
+        ws.send(json.dumps({"error": "An AI model is not available. The server may be starting up.", "models": models.status()}))
+        return
+
+    sample_rate = TARGET_SAMPLE_RATE
+    encoding = "pcm_s16le"
+    detector = VoiceActivityDetector(sample_rate=sample_rate)
+    stream_start = time.perf_counter()
+
+    try:
+        while True:
+            message = ws.receive()
+            if isinstance(message, str):
+                try:
+                    control = json.loads(message)
+                    if isinstance(control, dict) and control.get("event") == "end":
+                        break
+                    if detector.frame_count == 0:
+                        sample_rate, encoding = stream_format(control, sample_rate, encoding)
+                        detector = VoiceActivityDetector(sample_rate=sample_rate)
+                except ValueError as e:
+                    SPEECH_REQUESTS.inc(route="speech_stream", status=400)
+                    ws.send(json.dumps({"error": str(e)}))
+                    return
+                continue
+            if detector.push(pcm_to_float(message, encoding)):
+                log_event(logger, logging.DEBUG, "end_of_speech", audio_ms=detector.frame_count * VAD_FRAME_MS)
+                break
+
+        timings = {'stream': (time.perf_counter() - stream_start) * 1000.0}
+        utterance = detector.utterance()
+        audio_stats = speech_stats(detector.frame_count * detector.frame_length, len(utterance), sample_rate)
+        observe_audio(audio_stats)
+        log_event(logger, logging.DEBUG, "audio_stats", **audio_stats)
+        if not detector.has_speech:
+            RESOLUTIONS.inc(path="no_speech")
+            SPEECH_REQUESTS.inc(route="speech_stream", status=200)
+            ws.send(json.dumps({"intent": "UNKNOWN", "entity": None, "transcription": "", "tier": tier_router.level()}))
+            return
+
+        normalize_start = time.perf_counter()
+        speech_array = resample_linear(utterance, sample_rate)
+        speech_array = normalize_audio(np.array(speech_array, dtype=np.float32))
+        timings['normalize'] = (time.perf_counter() - normalize_start) * 1000.0
+
+        if not speech_gate.try_enter():
+            SPEECH_REQUESTS.inc(route="speech_stream", status=503)
+            ws.send(json.dumps({"error": "The server is busy. Please retry shortly.", "retry_after": speech_gate.retry_after()}))
+            return
+
+        finalize_start = time.perf_counter()
+        try:
+            tier = tier_router.select()
+            try:
+                response = dict(interpret_speech(speech_array, timings, tier), tier=tier.name)
+            finally:
+                tier_router.release(tier)
+        finally:
+            speech_gate.leave(time.perf_counter() - finalize_start)
+        TIER_REQUESTS.inc(tier=tier.name)
+        tier_router.observe(time.perf_counter() - finalize_start)
+        observe_timings(timings)
+        log_event(logger, logging.DEBUG, "stage_timings", **timings)
+        REQUEST_SECONDS.observe(time.perf_counter() - finalize_start, route="speech_stream")
+        SPEECH_REQUESTS.inc(route="speech_stream", status=200)
+        ws.send(json.dumps(response))
+
+    except ConnectionClosed:
+        # The client went away (e.g. stopped recording without {"event": "end"})
+        log_event(logger, logging.DEBUG, "stream_closed", audio_ms=detector.frame_count * VAD_FRAME_MS)
+
+    except Exception as e:
+        logger.exception("Streaming speech request failed")
+        SPEECH_REQUESTS.inc(route="speech_stream", status=500)
+        try:
+            ws.send(json.dumps({"error": str(e)}))
+        except ConnectionClosed:
+            pass
+
 # --- Main Execution Block ---
+# Development server. The reloader is off because it would import this module (and
+# load both models) twice; FLASK_DEBUG=1 still enables the interactive debugger.
+# For production use gunicorn with gunicorn.conf.py (see README).
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1', use_reloader=False)
\ No newline at end of file
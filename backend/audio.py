@@ -0,0 +1,382 @@
+import io
+import logging
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+try:
+    import av  # PyAV: in-process FFmpeg bindings for the fast decode path
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+# Whisper expects 16kHz mono float audio
+TARGET_SAMPLE_RATE = 16000
+
+# Same targets the pydub path used: normalize() peaks at -0.1 dBFS, and audio
+# quieter than -30 dBFS afterwards is boosted by (15 - dBFS) dB
+NORMALIZE_HEADROOM_DB = 0.1
+QUIET_THRESHOLD_DBFS = -30.0
+QUIET_BOOST_TARGET_DB = 15.0
+
+
+class AudioDecodeError(Exception):
+    """Raised when an audio blob cannot be decoded by any available decoder."""
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000.0
+
+
+def decode_with_pyav(audio_blob):
+    """
+    Decodes a compressed blob (e.g. the browser's webm/opus recording) straight
+    into a 16kHz mono float32 array, resampling inside FFmpeg.
+    """
+    resampler = av.AudioResampler(format='flt', layout='mono', rate=TARGET_SAMPLE_RATE)
+    chunks = []
+    with av.open(io.BytesIO(audio_blob), mode='r') as container:
+        stream = container.streams.audio[0]
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        # Flush any samples still buffered in the resampler
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32, copy=False)
+
+
+def decode_with_pydub(audio_blob):
+    """
+    Fallback decoder: lets pydub/ffmpeg handle formats the fast path can't, then
+    reads the PCM samples directly instead of round-tripping through a WAV file.
+    """
+    audio = AudioSegment.from_file(io.BytesIO(audio_blob))
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    samples /= float(1 << (8 * audio.sample_width - 1))
+    return samples
+
+
+def decode_audio(audio_blob, decoder="auto"):
+    """
+    Decodes an audio blob to a 16kHz mono float32 array.
+
+    `decoder` is "pyav", "pydub" or "auto" (PyAV first, pydub as the fallback).
+    Returns (samples, decoder_used).
+    """
+    if decoder in ("auto", "pyav") and av is not None:
+        try:
+            return decode_with_pyav(audio_blob), "pyav"
+        except Exception as e:
+            if decoder == "pyav":
+                raise AudioDecodeError(f"PyAV could not decode audio: {e}") from e
+            logger.debug("PyAV decode failed (%s), falling back to pydub", e)
+    elif decoder == "pyav":
+        raise AudioDecodeError("PyAV is not installed")
+
+    try:
+        return decode_with_pydub(audio_blob), "pydub"
+    except Exception as e:
+        raise AudioDecodeError(f"Could not decode audio: {e}") from e
+
+
+def dbfs(samples):
+    """Loudness of a float array in dBFS (full scale = 1.0); -inf for silence."""
+    if samples.size == 0:
+        return float('-inf')
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    return 20.0 * np.log10(rms) if rms > 0 else float('-inf')
+
+
+def normalize_audio(samples):
+    """
+    Vectorized equivalent of pydub's normalize() followed by the quiet-audio boost.
+    Works in place on `samples` and returns it.
+    """
+    if samples.size == 0:
+        return samples
+
+    # Normalize audio levels so the peak sits just below full scale
+    peak = float(np.max(np.abs(samples)))
+    if peak == 0:
+        return samples
+    samples *= (10 ** (-NORMALIZE_HEADROOM_DB / 20.0)) / peak
+
+    # Boost very quiet audio, clipping like integer PCM would
+    level = dbfs(samples)
+    if level < QUIET_THRESHOLD_DBFS:
+        samples *= 10 ** ((QUIET_BOOST_TARGET_DB - level) / 20.0)
+        np.clip(samples, -1.0, 1.0, out=samples)
+    return samples
+
+
+def load_speech_array(audio_blob, decoder="auto", trim=True):
+    """
+    Full decode stage for /api/speech: blob -> trimmed, normalized 16kHz mono
+    float32 array.
+
+    Leading and trailing silence is cut before normalizing, so quiet background
+    noise is never boosted into something Whisper would transcribe. When no
+    speech is found at all the returned array is empty.
+
+    Returns (samples, timings, audio_stats): timings holds per-stage milliseconds
+    and the decoder used; audio_stats holds the clip, speech and dropped
+    durations in milliseconds.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    samples, decoder_used = decode_audio(audio_blob, decoder=decoder)
+    timings['decode'] = _elapsed_ms(start)
+    timings['decoder'] = decoder_used
+
+    if trim:
+        start = time.perf_counter()
+        samples, audio_stats = trim_silence(samples)
+        timings['trim'] = _elapsed_ms(start)
+    else:
+        audio_stats = speech_stats(len(samples), len(samples))
+
+    start = time.perf_counter()
+    samples = normalize_audio(samples)
+    timings['normalize'] = _elapsed_ms(start)
+
+    return samples, timings, audio_stats
+
+
+def server_timing_header(timings):
+    """Formats stage timings (in ms) as a Server-Timing header value."""
+    parts = []
+    for stage, value in timings.items():
+        if isinstance(value, (int, float)):
+            parts.append(f"{stage};dur={value:.2f}")
+        else:
+            parts.append(f'{stage};desc="{value}"')
+    return ", ".join(parts)
+
+
+# --- Voice Activity Detection ---
+# Energy-based detection on 30ms frames. A frame is speech when it is well above
+# the background noise floor and above an absolute minimum level; an utterance
+# needs a short run of speech frames to start and ends after a run of silence.
+VAD_FRAME_MS = 30
+VAD_SPEECH_MARGIN_DB = 12.0
+VAD_MIN_SPEECH_DBFS = -55.0
+VAD_MIN_SPEECH_MS = 90
+VAD_END_SILENCE_MS = 450
+VAD_PADDING_MS = 150
+VAD_MAX_UTTERANCE_MS = 8000
+# A stream that hasn't started speaking by then is finalized as no speech
+VAD_MAX_LISTEN_MS = 10000
+
+# How fast the streaming noise floor estimate is allowed to rise (dB per frame)
+VAD_FLOOR_RELAX_DB = 0.02
+# Highest noise floor assumed for a complete clip: a clip without quiet frames
+# (e.g. cropped tightly around the speech) must not raise the floor to its speech
+VAD_MAX_NOISE_FLOOR_DBFS = -45.0
+
+
+def frame_levels(samples, frame_length):
+    """Per-frame RMS level in dBFS for every complete frame of `samples`."""
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    power = np.mean(np.square(frames, dtype=np.float64), axis=1)
+    return (10.0 * np.log10(np.maximum(power, 1e-12))).astype(np.float32)
+
+
+class VoiceActivityDetector:
+    """
+    Streaming voice activity detector. Audio is pushed as it arrives and
+    `push()` returns True once speech has started and then ended (or the
+    utterance hit the maximum length), or when nothing was said within
+    VAD_MAX_LISTEN_MS. The noise floor follows the quietest recent frames, so it
+    adapts to the microphone without a calibration step. Until speech starts
+    only the last VAD_PADDING_MS (plus any speech run that may start an
+    utterance) is kept.
+    """
+
+    def __init__(self, sample_rate=TARGET_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+        self.min_speech_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+        self.end_silence_frames = max(1, VAD_END_SILENCE_MS // VAD_FRAME_MS)
+        self.max_frames = VAD_MAX_UTTERANCE_MS // VAD_FRAME_MS
+        self.max_listen_frames = VAD_MAX_LISTEN_MS // VAD_FRAME_MS
+        self.padding = int(sample_rate * VAD_PADDING_MS / 1000)
+
+        self._chunks = []
+        self._offset = 0  # stream position of the first kept sample
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.frame_count = 0
+        self.noise_floor = None
+        self.speech_run = 0
+        self.silence_run = 0
+        self.speech_start = None  # first speech frame of the utterance
+        self.speech_end = None  # last speech frame seen so far
+        self.ended = False
+
+    def push(self, samples):
+        """Feeds float32 samples; returns True once the utterance has ended."""
+        if self.ended:
+            return True
+        self._chunks.append(samples)
+        pending = np.concatenate([self._pending, samples]) if self._pending.size else samples
+        usable = len(pending) - len(pending) % self.frame_length
+        self._pending = pending[usable:]
+
+        for level in frame_levels(pending[:usable], self.frame_length):
+            self._process_frame(float(level))
+            if self.ended:
+                break
+        if not self.has_speech:
+            self._drop_before((self.frame_count - self.speech_run) * self.frame_length - self.padding)
+        return self.ended
+
+    def _drop_before(self, position):
+        # Forget the audio before stream position `position`
+        drop = position - self._offset
+        if drop > 0:
+            self._chunks = [self.audio()[drop:]]
+            self._offset = position
+
+    def _process_frame(self, level):
+        index = self.frame_count
+        self.frame_count += 1
+
+        if self.noise_floor is None:
+            self.noise_floor = level
+        else:
+            self.noise_floor = min(self.noise_floor + VAD_FLOOR_RELAX_DB, level)
+
+        is_speech = level > max(self.noise_floor + VAD_SPEECH_MARGIN_DB, VAD_MIN_SPEECH_DBFS)
+        if is_speech:
+            self.speech_run += 1
+            self.silence_run = 0
+            if self.speech_start is None and self.speech_run >= self.min_speech_frames:
+                self.speech_start = index - self.speech_run + 1
+            if self.speech_start is not None:
+                self.speech_end = index
+        else:
+            self.speech_run = 0
+            self.silence_run += 1
+
+        if self.speech_start is not None:
+            if self.silence_run >= self.end_silence_frames or index - self.speech_start >= self.max_frames:
+                self.ended = True
+        elif self.frame_count >= self.max_listen_frames:
+            self.ended = True
+
+    @property
+    def has_speech(self):
+        return self.speech_start is not None
+
+    def audio(self):
+        """The audio kept so far, starting at stream position `_offset`."""
+        if not self._chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._chunks)
+
+    def utterance(self):
+        """The detected speech plus padding, or an empty array if no speech was found."""
+        if not self.has_speech:
+            return np.zeros(0, dtype=np.float32)
+        return slice_speech(self.audio(), self.speech_start, self.speech_end, self.frame_length, self.sample_rate,
+                            offset=self._offset)
+
+
+def slice_speech(samples, first_frame, last_frame, frame_length, sample_rate=TARGET_SAMPLE_RATE, offset=0):
+    """
+    Cuts frames [first_frame, last_frame] out of `samples`, keeping VAD_PADDING_MS
+    on each side. `offset` is the stream position of samples[0], for streams whose
+    start was dropped.
+    """
+    padding = int(sample_rate * VAD_PADDING_MS / 1000)
+    start = max(0, first_frame * frame_length - padding - offset)
+    end = min(len(samples), (last_frame + 1) * frame_length + padding - offset)
+    return samples[start:end]
+
+
+def find_speech_bounds(samples, sample_rate=TARGET_SAMPLE_RATE):
+    """
+    Offline counterpart of VoiceActivityDetector for a complete clip. Returns
+    (first_frame, last_frame, frame_length) of the detected speech, or None.
+    """
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    levels = frame_levels(samples, frame_length)
+    if levels.size == 0:
+        return None
+
+    # With the whole clip available, a low percentile is a steadier noise floor
+    noise_floor = min(float(np.percentile(levels, 10)), VAD_MAX_NOISE_FLOOR_DBFS)
+    speech = levels > max(noise_floor + VAD_SPEECH_MARGIN_DB, VAD_MIN_SPEECH_DBFS)
+    if speech.all():
+        # Nothing quiet to cut: the whole clip is speech
+        return 0, int(levels.size - 1), frame_length
+
+    # Only runs of at least VAD_MIN_SPEECH_MS count as speech (drops clicks and pops)
+    min_run = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    run_sums = np.convolve(speech.astype(np.int32), np.ones(min_run, dtype=np.int32), mode='valid')
+    run_starts = np.flatnonzero(run_sums == min_run)
+    if run_starts.size == 0:
+        return None
+    return int(run_starts[0]), int(run_starts[-1] + min_run - 1), frame_length
+
+
+PCM_ENCODINGS = ("pcm_s16le", "pcm_f32le")
+# Sample rates accepted for raw PCM streams
+PCM_MIN_SAMPLE_RATE = 8000
+PCM_MAX_SAMPLE_RATE = 96000
+
+
+def pcm_to_float(data, encoding="pcm_s16le"):
+    """Converts raw little-endian PCM bytes to a float32 array in [-1, 1]."""
+    if encoding == "pcm_s16le":
+        return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    if encoding == "pcm_f32le":
+        return np.frombuffer(data, dtype='<f4').astype(np.float32)
+    raise ValueError(f"Unsupported PCM encoding: {encoding}")
+
+
+def resample_linear(samples, source_rate, target_rate=TARGET_SAMPLE_RATE):
+    """Cheap linear-interpolation resampler for raw PCM streams."""
+    if source_rate == target_rate or samples.size == 0:
+        return samples
+    target_length = int(round(len(samples) * target_rate / source_rate))
+    positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def speech_stats(total_samples, speech_samples, sample_rate=TARGET_SAMPLE_RATE):
+    """Clip, kept speech and dropped audio durations in milliseconds."""
+    to_ms = 1000.0 / sample_rate
+    return {
+        "audio_ms": round(total_samples * to_ms, 1),
+        "speech_ms": round(speech_samples * to_ms, 1),
+        "dropped_ms": round((total_samples - speech_samples) * to_ms, 1)
+    }
+
+
+def trim_silence(samples, sample_rate=TARGET_SAMPLE_RATE):
+    """
+    Cuts leading and trailing silence from a complete clip. Returns
+    (speech_samples, audio_stats); speech_samples is empty if no speech was found.
+    """
+    bounds = find_speech_bounds(samples, sample_rate)
+    if bounds is None:
+        speech = samples[:0]
+    else:
+        speech = slice_speech(samples, *bounds, sample_rate=sample_rate)
+    return speech, speech_stats(len(samples), len(speech), sample_rate)
+
+
+def audio_stats_header(audio_stats):
+    """Formats audio_stats as a compact header value, e.g. "audio_ms=5000.0, speech_ms=840.0"."""
+    return ", ".join(f"{key}={value}" for key, value in audio_stats.items())
@@ -0,0 +1,400 @@
+"""
+Offline end-to-end benchmark for the speech-command pipeline.
+
+Drives the Flask app in-process with a corpus of command clips and reports
+per-stage latency (decode, trim, normalize, ASR, rules, classifier fallback),
+throughput at several client concurrencies, memory high-water mark and
+intent/entity accuracy, as JSON that can be compared between commits.
+
+    # Build a synthetic corpus (several codecs and lengths) from the golden commands
+    python benchmark.py synthesize bench_corpus
+
+    # Timing-only run with stub models (no model downloads, no torch needed)
+    python benchmark.py run bench_corpus/manifest.json --models stub --output results.json
+
+    # Full run against locally cached models, then compare with a previous commit
+    python benchmark.py run clips/manifest.json --models real --output new.json --compare results.json
+
+Corpus manifests use the same format as precision_report.py:
+    [{"file": "skip.webm", "transcript": "skip", "intent": "SKIP_EXERCISE", "entity": null}, ...]
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ("decode", "trim", "normalize", "asr", "rules", "classifier")
+
+# (container format, codec, file extension) for synthesized clips
+SYNTH_CODECS = [
+    ("webm", "libopus", "webm"),
+    ("ogg", "libopus", "ogg"),
+    ("wav", "pcm_s16le", "wav"),
+    ("mp3", "libmp3lame", "mp3"),
+    ("adts", "aac", "aac"),
+]
+
+# (speech seconds, total clip seconds): a short command in a short clip up to
+# the frontend's fixed 5 second recording
+SYNTH_LENGTHS = [(0.6, 1.0), (1.0, 3.0), (1.5, 5.0)]
+
+
+# --- Corpus ---
+def fingerprint(samples):
+    return hashlib.sha1(np.ascontiguousarray(samples, dtype=np.float32).tobytes()).hexdigest()
+
+
+def synthesize_speech(speech_seconds, total_seconds, sample_rate, seed):
+    """Speech-like audio: syllable-rate bursts of harmonics between stretches of low noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech_seconds * sample_rate)) / sample_rate
+    pitch = rng.uniform(100, 220)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    envelope = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 5) * t))
+    speech = 0.3 * voice * envelope / 2.3
+
+    lead = int(rng.uniform(0.1, 0.9) * (total_seconds - speech_seconds) * sample_rate)
+    clip = rng.standard_normal(int(total_seconds * sample_rate)) * 0.002
+    clip[lead:lead + len(speech)] += speech
+    return clip.astype(np.float32)
+
+
+def encode_clip(samples, sample_rate, container, codec):
+    import av
+
+    buffer = io.BytesIO()
+    with av.open(buffer, mode='w', format=container) as output:
+        stream = output.add_stream(codec, rate=sample_rate)
+        stream.layout = 'mono'
+        frame_size = stream.codec_context.frame_size or 1024
+        sample_format = stream.codec_context.format.name
+        for start in range(0, len(samples), frame_size):
+            chunk = samples[start:start + frame_size]
+            if len(chunk) < frame_size:
+                chunk = np.pad(chunk, (0, frame_size - len(chunk)))
+            frame = av.AudioFrame.from_ndarray(chunk.reshape(1, -1), format='flt', layout='mono')
+            frame.sample_rate = sample_rate
+            if sample_format != 'flt':
+                frame = av.AudioResampler(format=sample_format, layout='mono', rate=sample_rate).resample(frame)[0]
+            for packet in stream.encode(frame):
+                output.mux(packet)
+        for packet in stream.encode(None):
+            output.mux(packet)
+    return buffer.getvalue()
+
+
+def synthesize_corpus(output_dir, per_codec=None):
+    """
+    Writes synthetic clips for the golden commands that the rules resolve on their
+    own, in every codec and length, plus a manifest.json. The audio isn't real
+    speech, so this corpus is for --models stub (timing) runs.
+    """
+    from commands import load_golden_commands
+
+    os.makedirs(output_dir, exist_ok=True)
+    cases = [case for case in load_golden_commands() if case["classifier_intent"] is None and case["expected"]]
+    # Plus utterances that fall through to the classifier, to time that stage
+    cases += [case for case in load_golden_commands() if case["classifier_intent"] == "UNKNOWN"]
+    if per_codec:
+        cases = cases[:per_codec]
+
+    manifest = []
+    sample_rate = 48000
+    for codec_index, (container, codec, extension) in enumerate(SYNTH_CODECS):
+        for case_index, case in enumerate(cases):
+            speech_seconds, total_seconds = SYNTH_LENGTHS[case_index % len(SYNTH_LENGTHS)]
+            samples = synthesize_speech(speech_seconds, total_seconds, sample_rate, seed=codec_index * 1000 + case_index)
+            name = f"{case_index:03d}_{total_seconds:g}s.{extension}"
+            with open(os.path.join(output_dir, name), 'wb') as f:
+                f.write(encode_clip(samples, sample_rate, container, codec))
+            manifest.append({
+                "file": name,
+                "codec": codec,
+                "seconds": total_seconds,
+                "transcript": case["text"],
+                "intent": case["expected"]["intent"],
+                "entity": case["expected"]["entity"]
+            })
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_corpus(manifest_path):
+    with open(manifest_path) as f:
+        clips = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    for clip in clips:
+        with open(os.path.join(base_dir, clip["file"]), 'rb') as f:
+            clip["audio"] = f.read()
+    return clips
+
+
+# --- Stub Models ---
+class StubTranscriber:
+    """
+    Stands in for the Whisper pipeline: returns each clip's manifest transcript,
+    looked up by a fingerprint of the exact array the app hands to ASR.
+    """
+
+    def __init__(self, transcripts, delay_ms=0.0):
+        self.transcripts = transcripts
+        self.delay = delay_ms / 1000.0
+        self.model = None
+
+    def __call__(self, inputs, batch_size=None, generate_kwargs=None, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(inputs, list):
+            return [{"text": self.transcripts.get(fingerprint(x), "")} for x in inputs]
+        return {"text": self.transcripts.get(fingerprint(inputs), "")}
+
+
+class StubClassifier:
+    """Stands in for the intent classifier: always below the confidence gate."""
+
+    name = "stub"
+
+    def __init__(self, delay_ms=0.0):
+        self.delay = delay_ms / 1000.0
+
+    def __call__(self, text):
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts):
+        # One simulated model call per batch, like the real engines
+        from intent_classifier import CLASSIFICATION_LABELS
+        if self.delay:
+            time.sleep(self.delay)
+        share = 1.0 / len(CLASSIFICATION_LABELS)
+        return [{"sequence": text, "labels": list(CLASSIFICATION_LABELS), "scores": [share] * len(CLASSIFICATION_LABELS)}
+                for text in texts]
+
+
+def load_app(model_mode, clips, stub_asr_ms=0.0, stub_classifier_ms=0.0):
+    """Imports the Flask app with real (locally cached) or stub models and waits until ready."""
+    if model_mode == "real":
+        # Never reach out to the Hub: only locally cached models are used
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+        import app
+    else:
+        os.environ["MODELS_AUTOSTART"] = "0"
+        import app
+        from audio import load_speech_array
+
+        transcripts = {}
+        for clip in clips:
+            samples, _, _ = load_speech_array(clip["audio"], decoder=app.AUDIO_DECODER, trim=app.TRIM_SILENCE)
+            transcripts[fingerprint(samples)] = clip.get("transcript", "")
+        app.models.register('transcriber', lambda: StubTranscriber(transcripts, stub_asr_ms))
+        app.models.register('classifier', lambda: StubClassifier(stub_classifier_ms))
+        app.models.start()
+
+    app.models.wait()
+    if not app.models.is_ready():
+        raise SystemExit(f"Models failed to load: {json.dumps(app.models.status())}")
+    return app
+
+
+# --- Measurement ---
+def parse_server_timing(header):
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            timings[name] = float(params[4:])
+    return timings
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "mean": round(float(np.mean(values)), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "count": len(values)
+    }
+
+
+def send(app, clip):
+    client = app.app.test_client()
+    start = time.perf_counter()
+    response = client.post('/api/speech', data=clip["audio"])
+    total_ms = (time.perf_counter() - start) * 1000.0
+    return clip, response.status_code, response.get_json(), parse_server_timing(response.headers.get('Server-Timing')), total_ms
+
+
+def run_level(app, clips, concurrency, repeats):
+    requests = [clip for _ in range(repeats) for clip in clips]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda clip: send(app, clip), requests))
+    wall = time.perf_counter() - start
+    return results, wall
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(manifest_path, model_mode="stub", concurrency=(1, 4, 8, 16), repeats=1,
+                  stub_asr_ms=0.0, stub_classifier_ms=0.0):
+    clips = load_corpus(manifest_path)
+    app = load_app(model_mode, clips, stub_asr_ms, stub_classifier_ms)
+    rss_after_load = current_rss_mb()
+
+    # Sequential pass: per-stage latency and accuracy without queueing effects
+    results, _ = run_level(app, clips, 1, 1)
+    stage_values = {stage: [] for stage in STAGES}
+    totals, intent_hits, entity_hits, failures = [], 0, 0, 0
+    for clip, status, payload, timings, total_ms in results:
+        totals.append(total_ms)
+        for stage in STAGES:
+            if stage in timings:
+                stage_values[stage].append(timings[stage])
+        if status != 200:
+            failures += 1
+            continue
+        intent_hits += payload.get("intent") == clip.get("intent")
+        entity_hits += payload.get("entity") == clip.get("entity")
+
+    throughput = {}
+    for level in concurrency:
+        level_results, wall = run_level(app, clips, level, repeats)
+        latencies = [total_ms for _, _, _, _, total_ms in level_results]
+        throughput[str(level)] = {
+            "requests_per_s": round(len(level_results) / wall, 3),
+            "latency_ms": summarize(latencies),
+            "errors": sum(status != 200 for _, status, _, _, _ in level_results)
+        }
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "manifest": manifest_path,
+            "models": model_mode,
+            "clips": len(clips),
+            "repeats": repeats,
+            "intent_classifier": app.INTENT_CLASSIFIER,
+            "inference_precision": app.INFERENCE_PRECISION,
+            "audio_decoder": app.AUDIO_DECODER,
+            "trim_silence": app.TRIM_SILENCE,
+            "speech_max_batch": app.SPEECH_MAX_BATCH,
+            "speech_batch_window_ms": app.SPEECH_BATCH_WINDOW_MS,
+            "model_tiering": app.MODEL_TIERING
+        },
+        "stages_ms": {stage: summarize(values) for stage, values in stage_values.items()},
+        "request_ms": summarize(totals),
+        "throughput": throughput,
+        "accuracy": {
+            "intent": round(intent_hits / len(clips), 4),
+            "entity": round(entity_hits / len(clips), 4),
+            "failed_requests": failures
+        },
+        "memory_mb": {
+            "rss_after_load": round(rss_after_load, 1),
+            "peak_rss": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+    }
+
+
+# --- Comparison ---
+def comparable_metrics(result):
+    """Flattens a result into {metric: (value, higher_is_better)}."""
+    metrics = {}
+    for stage, summary in result["stages_ms"].items():
+        if summary:
+            metrics[f"stage.{stage}.p50_ms"] = (summary["p50"], False)
+            metrics[f"stage.{stage}.p95_ms"] = (summary["p95"], False)
+    metrics["request.p95_ms"] = (result["request_ms"]["p95"], False)
+    for level, summary in result["throughput"].items():
+        metrics[f"throughput.c{level}.rps"] = (summary["requests_per_s"], True)
+    metrics["accuracy.intent"] = (result["accuracy"]["intent"], True)
+    metrics["accuracy.entity"] = (result["accuracy"]["entity"], True)
+    metrics["memory.peak_rss_mb"] = (result["memory_mb"]["peak_rss"], False)
+    return metrics
+
+
+def compare_results(baseline, current, tolerance=0.10):
+    """Prints metric deltas and returns the metrics that regressed by more than `tolerance`."""
+    old_metrics, new_metrics = comparable_metrics(baseline), comparable_metrics(current)
+    regressions = []
+    print(f"{'metric':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, (new_value, higher_is_better) in new_metrics.items():
+        if name not in old_metrics:
+            continue
+        old_value = old_metrics[name][0]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<32} {old_value:>12.3f} {new_value:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the speech-command pipeline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    synth = subparsers.add_parser('synthesize', help="Write a synthetic multi-codec corpus")
+    synth.add_argument('output_dir')
+    synth.add_argument('--per-codec', type=int, help="Limit the number of commands per codec")
+
+    run = subparsers.add_parser('run', help="Run the benchmark on a corpus manifest")
+    run.add_argument('manifest')
+    run.add_argument('--models', choices=['stub', 'real'], default='stub')
+    run.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    run.add_argument('--repeats', type=int, default=1, help="Passes over the corpus per concurrency level")
+    run.add_argument('--stub-asr-ms', type=float, default=0.0, help="Simulated ASR time per batch (stub models)")
+    run.add_argument('--stub-classifier-ms', type=float, default=0.0, help="Simulated classifier time (stub models)")
+    run.add_argument('--output', help="Write the JSON results here")
+    run.add_argument('--compare', help="Baseline results JSON to compare against")
+    run.add_argument('--tolerance', type=float, default=0.10, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == 'synthesize':
+        manifest = synthesize_corpus(args.output_dir, args.per_codec)
+        print(f"Wrote {len(manifest)} clips to {args.output_dir}")
+        return
+
+    result = run_benchmark(args.manifest, args.models, args.concurrency, args.repeats,
+                           args.stub_asr_ms, args.stub_classifier_ms)
+    serialized = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(serialized + "\n")
+    else:
+        print(serialized)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), result, args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Bulk recognition of many recorded clips, for QA replays and offline scoring.
+
+Clips are consumed lazily and decoded on a small thread pool while earlier clips
+are transcribed, so only a few chunks of audio are in memory at any time however
+large the input set is. Results come back per clip, in input order, as soon as
+the chunk holding the clip has been resolved.
+"""
+import os
+import shutil
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Archive members that are never audio clips
+_SKIPPED_PREFIXES = ("__MACOSX/", ".")
+
+
+def iter_archive(archive, max_clip_bytes=None):
+    """
+    Yields (name, audio bytes) for each file in a zip archive (path or seekable file
+    object). The archive is opened straight away, so a corrupt one fails here; a
+    member larger than `max_clip_bytes` once extracted raises ValueError when reached.
+    """
+    return _archive_members(zipfile.ZipFile(archive), max_clip_bytes)
+
+
+def _archive_members(zf, max_clip_bytes):
+    with zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith(_SKIPPED_PREFIXES) or os.path.basename(name).startswith("."):
+                continue
+            with zf.open(info) as member:
+                # Read one byte past the limit, so a member whose header understates
+                # its size can't be extracted in full
+                blob = member.read(-1 if max_clip_bytes is None else max_clip_bytes + 1)
+            if max_clip_bytes is not None and len(blob) > max_clip_bytes:
+                raise ValueError(f"Archive member '{name}' is larger than {max_clip_bytes} bytes")
+            yield name, blob
+
+
+def spool_uploads(files, spool):
+    """
+    Copies uploaded files (objects with .filename and .stream) one after another
+    into the file `spool`, then returns an iterator of (name, audio bytes) that
+    reads them back one at a time.
+    """
+    entries = []
+    for index, upload in enumerate(files):
+        start = spool.tell()
+        shutil.copyfileobj(upload.stream, spool)
+        entries.append((upload.filename or f"clip-{index}", start, spool.tell() - start))
+    return _spooled_clips(spool, entries)
+
+
+def _spooled_clips(spool, entries):
+    for name, start, length in entries:
+        spool.seek(start)
+        yield name, spool.read(length)
+
+
+def recognize_clips(clips, decode, transcribe, resolve, chunk_size=8, decode_workers=4):
+    """
+    Runs (name, audio bytes) pairs through the speech pipeline in chunks.
+
+    decode(blob) -> (samples, timings, audio_stats), as audio.load_speech_array
+    transcribe(list of samples) -> list of transcriptions
+    resolve(list of transcriptions) -> list of command payloads
+
+    Yields one dict per clip: {"clip": name, **payload}, or {"clip": name, "error": ...}
+    when the clip could not be decoded or recognized. If reading the clips fails,
+    the clips read before are still yielded and the error is raised after them.
+    """
+    chunk_size = max(1, int(chunk_size))
+    clips = iter(clips)
+    pending = deque()
+    failure = None
+
+    with ThreadPoolExecutor(max_workers=max(1, decode_workers), thread_name_prefix="bulk-decode") as pool:
+        def fill():
+            # Keep the next chunk decoding while the current one is transcribed
+            nonlocal failure
+            while failure is None and len(pending) < 2 * chunk_size:
+                try:
+                    name, blob = next(clips)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    failure = e
+                    return
+                pending.append((name, pool.submit(decode, blob)))
+
+        fill()
+        while pending:
+            chunk = [pending.popleft() for _ in range(min(chunk_size, len(pending)))]
+            fill()
+
+            results, speech = {}, []
+            for index, (name, future) in enumerate(chunk):
+                try:
+                    samples, _, _ = future.result()
+                except Exception as e:
+                    results[index] = {"clip": name, "error": str(e)}
+                    continue
+                if samples.size == 0:
+                    results[index] = {"clip": name, "intent": "UNKNOWN", "entity": None, "transcription": ""}
+                else:
+                    speech.append((index, samples))
+
+            if speech:
+                try:
+                    payloads = resolve(transcribe([samples for _, samples in speech]))
+                except Exception as e:
+                    payloads = [{"error": str(e)}] * len(speech)
+                for (index, _), payload in zip(speech, payloads):
+                    results[index] = dict({"clip": chunk[index][0]}, **payload)
+
+            for index in range(len(chunk)):
+                yield results[index]
+
+    if failure is not None:
+        raise failure
@@ -0,0 +1,103 @@
+"""
+Command decoding mode for Whisper (WHISPER_DECODING=command).
+
+Free decoding lets Whisper write up to ~448 tokens of arbitrary text, although
+every utterance we act on is a short command. In command mode each batched
+generate() call gets:
+  - a token budget: enough for the longest command phrase, and no more than the
+    clip's speech duration can hold at a fast speaking rate
+  - a logit bias toward the tokens that spell the command vocabulary, so close
+    calls ("plank" / "blank", "squats" / "squads") tip toward commands while any
+    other text can still be transcribed for the intent classifier
+  - early stopping as soon as every clip in the batch is a whole command
+    sentence such as "Next exercise." (see commands.command_complete)
+
+The encoder still sees Whisper's fixed 30-second padded window; the savings are
+all on the decoder side, which is where short clips spend most of their time.
+"""
+import math
+
+from commands import command_complete, command_phrases
+from instrumentation import ASR_EARLY_STOPS
+
+WHISPER_DECODINGS = ("free", "command")
+
+# Speech rarely exceeds ~3.5 words/s, and command words average under two tokens
+TOKENS_PER_SECOND = 6
+# Room on top of the longest phrase for a lead-in word, punctuation and end-of-text
+COMMAND_TOKEN_MARGIN = 4
+# Added to the logits of command vocabulary tokens at every decoding step
+DEFAULT_COMMAND_BIAS = 2.0
+
+_PUNCTUATION_TOKENS = (".", ",", "!", "?")
+
+
+class CommandBiasLogitsProcessor:
+    """Adds a constant to the scores of the command vocabulary tokens."""
+
+    def __init__(self, token_ids, bias):
+        self.token_ids = sorted(token_ids)
+        self.bias = bias
+
+    def __call__(self, input_ids, scores):
+        scores[:, self.token_ids] += self.bias
+        return scores
+
+
+class CommandStoppingCriteria:
+    """Stops generation once every unfinished sequence is a whole command sentence."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.eos_token_id = tokenizer.eos_token_id
+
+    def __call__(self, input_ids, scores, **kwargs):
+        for row in input_ids.tolist():
+            if self.eos_token_id in row:
+                continue
+            if not command_complete(self.tokenizer.decode(row, skip_special_tokens=True)):
+                return False
+        ASR_EARLY_STOPS.inc()
+        return True
+
+
+class CommandDecoding:
+    """Builds the generate() arguments of command mode for one Whisper tokenizer."""
+
+    def __init__(self, tokenizer, bias=DEFAULT_COMMAND_BIAS, max_tokens=None, sample_rate=16000):
+        self.tokenizer = tokenizer
+        self.sample_rate = sample_rate
+        self.bias = bias
+
+        # Whisper writes words with a leading space and usually capitalizes the
+        # first one, so each phrase is tokenized in the forms it appears in
+        token_ids, longest = set(), 0
+        for phrase in command_phrases():
+            for form in (phrase, phrase.capitalize(), " " + phrase, " " + phrase.capitalize()):
+                ids = tokenizer.encode(form, add_special_tokens=False)
+                token_ids.update(ids)
+                longest = max(longest, len(ids))
+        for mark in _PUNCTUATION_TOKENS:
+            token_ids.update(tokenizer.encode(mark, add_special_tokens=False))
+        self.token_ids = token_ids
+        self.max_tokens = max_tokens or longest + COMMAND_TOKEN_MARGIN
+
+        self.logits_processor = CommandBiasLogitsProcessor(token_ids, bias)
+        self.stopping_criteria = CommandStoppingCriteria(tokenizer)
+
+    def token_budget(self, speech_arrays):
+        """Most new tokens the longest clip of a batch may need, capped at max_tokens."""
+        longest_seconds = max((len(samples) for samples in speech_arrays), default=0) / self.sample_rate
+        by_duration = math.ceil(longest_seconds * TOKENS_PER_SECOND) + COMMAND_TOKEN_MARGIN
+        return min(self.max_tokens, by_duration)
+
+    def generate_kwargs(self, speech_arrays):
+        from transformers import LogitsProcessorList, StoppingCriteriaList
+
+        generate_kwargs = {
+            "max_new_tokens": self.token_budget(speech_arrays),
+            "stopping_criteria": StoppingCriteriaList([self.stopping_criteria])
+        }
+        if self.bias:
+            generate_kwargs["logits_processor"] = LogitsProcessorList([self.logits_processor])
+        return generate_kwargs
@@ -0,0 +1,428 @@
+import json
+import os
+import string
+from collections import deque
+
+# --- Command Grammar ---
+# Everything the rule-based stage of /api/speech can recognize. The grammar is
+# compiled once at import time into two Aho-Corasick matchers, so adding phrases
+# or mishearings does not add per-request cost.
+#
+# Precedence (unchanged from the original inline rules):
+#   1. The whole cleaned utterance is a known command word ("direct" match)
+#   2. PHRASE_RULES, in group order, matched against the lowercased text
+#   3. EXERCISE_KEYWORDS, in list order, matched against the cleaned text
+#   4. EXERCISE_MISHEARINGS, in table order, matched against the cleaned text
+#   5. Otherwise the utterance is left to the intent classifier (BART)
+
+# Utterances that are a single command on their own
+SINGLE_WORD_COMMANDS = {
+    "start": "start workout",
+    "begin": "start workout",
+    "go": "start workout",
+    "workout": "start workout",
+    "stop": "stop workout",
+    "end": "stop workout",
+    "quit": "stop workout",
+    "done": "stop workout",
+    "finish": "stop workout",
+    "skip": "skip exercise",
+    "next": "skip exercise",
+    "pass": "skip exercise",
+    "rest": "add rest",
+    "break": "add rest",
+    "pause": "add rest",
+    # Exercise names
+    "plank": "switch exercise",
+    "planks": "switch exercise",
+    "pushup": "switch exercise",
+    "pushups": "switch exercise",
+    "push up": "switch exercise",
+    "push ups": "switch exercise",
+    "squat": "switch exercise",
+    "squats": "switch exercise",
+    "bridge": "switch exercise",
+    "bridges": "switch exercise",
+    "superman": "switch exercise",
+    "lunge": "switch exercise",
+    "lunges": "switch exercise",
+    "wall sit": "switch exercise",
+    "high knees": "switch exercise"
+}
+
+# Exercise names for single-word exercise commands
+SINGLE_WORD_EXERCISES = {
+    "plank": "Plank", "planks": "Plank",
+    "pushup": "Push-up", "pushups": "Push-up",
+    "push up": "Push-up", "push ups": "Push-up",
+    "squat": "Squat", "squats": "Squat",
+    "bridge": "Bridge", "bridges": "Bridge",
+    "superman": "Superman",
+    "lunge": "Lunges", "lunges": "Lunges",
+    "wall sit": "Wall-sit", "wall seat": "Wall-sit", "wall seed": "Wall-sit", "wall seet": "Wall-sit",
+    "high knees": "High Knees", "high knee": "High Knees", "hi knees": "High Knees", "hi knee": "High Knees"
+}
+
+# Common phrases, checked group by group; the first group with any phrase present wins
+PHRASE_RULES = [
+    ("start workout", ["start workout", "begin workout", "start exercise"]),
+    ("stop workout", ["stop workout", "end workout", "quit workout", "stop exercise", "end exercise"]),
+    ("skip exercise", ["skip exercise", "next exercise"]),
+    ("stop workout", [
+        "need rest", "need a rest", "i need rest", "i need a rest",
+        "take a rest", "need a break", "i need a break", "need to rest", "need to take a rest",
+        "want to rest", "want a break", "have a rest", "take a break"
+    ]),
+    ("add rest", ["add rest", "take rest"]),
+]
+
+# Exercise names that weren't caught by direct matching
+EXERCISE_KEYWORDS = ["plank", "squat", "pushup", "push up", "bridge", "superman", "lunge", "wall sit", "high knee"]
+
+# Common misheard words, checked only when no exercise keyword is present
+EXERCISE_MISHEARINGS = {
+    "clank": "plank",  # Common mishearing
+    "bank": "plank",  # Common mishearing
+    "blank": "plank",  # Common mishearing
+    "plant": "plank",  # Common mishearing
+    "squad": "squat",  # Common mishearing
+    "what": "squat",  # Common mishearing
+    "squid": "squat",  # Common mishearing
+    "push": "pushup",  # Shortened form
+    "pushed": "pushup",  # Past tense
+    "brush": "pushup",  # Common mishearing
+    "lunch": "lunge",  # Common mishearing
+    "launch": "lunge",  # Common mishearing
+    "lung": "lunge",  # Shortened form
+    "super": "superman",  # Shortened form
+    "supa": "superman",  # Common mishearing
+    "supreme": "superman",  # Common mishearing
+    "wall seat": "wall sit",  # Common mishearing
+    "wall seed": "wall sit",  # Common mishearing
+    "wall seet": "wall sit",  # Common mishearing
+}
+
+# Exercise names for keyword and mishearing matches
+KEYWORD_EXERCISES = {
+    "plank": "Plank",
+    "squat": "Squat",
+    "pushup": "Push-up", "push up": "Push-up",
+    "bridge": "Bridge",
+    "superman": "Superman",
+    "lunge": "Lunges",
+    "wall sit": "Wall-sit",
+    "high knee": "High Knees"
+}
+
+# Expanded exercise entities with variations
+EXERCISE_ENTITIES = [
+    'plank', 'planks', 'plank exercise',
+    'push up', 'push ups', 'pushup', 'pushups', 'press up', 'press ups',
+    'squat', 'squats', 'squat exercise',
+    'bridge', 'bridges', 'bridge pose', 'glute bridge',
+    'bird dog', 'bird dogs', 'birddog', 'bird-dog',
+    'high knees', 'high knee', 'knee ups', 'knee raise',
+    'lunges', 'lunge', 'lung', 'forward lunge',
+    'superman', 'supermans', 'superman pose', 'superman exercise',
+    'wall sit', 'wall sits', 'wall squat', 'wallsit'
+]
+
+# Convert entity variations to the exercise names used by the frontend
+# (e.g., "push up" -> "Push-up"); unlisted variations fall back to title case
+EXERCISE_ENTITY_NAMES = {
+    "plank": "Plank", "planks": "Plank", "plank exercise": "Plank",
+    "push up": "Push-up", "push ups": "Push-up", "pushup": "Push-up", "pushups": "Push-up",
+    "squat": "Squat", "squats": "Squat", "squat exercise": "Squat",
+    "bridge": "Bridge", "bridges": "Bridge", "bridge pose": "Bridge", "glute bridge": "Bridge",
+    "bird dog": "Bird-dog", "bird dogs": "Bird-dog", "birddog": "Bird-dog", "bird-dog": "Bird-dog",
+    "high knees": "High Knees", "high knee": "High Knees", "knee ups": "High Knees",
+    "lunges": "Lunges", "lunge": "Lunges", "lung": "Lunges",
+    "superman": "Superman", "supermans": "Superman", "superman pose": "Superman",
+    "wall sit": "Wall-sit", "wall sits": "Wall-sit", "wallsit": "Wall-sit"
+}
+
+# Enhanced routine entities with more variations
+ROUTINE_ENTITIES = {
+    "core strength": "core_strength",
+    "core workout": "core_strength",
+    "core": "core_strength",
+    "abs workout": "core_strength",
+    "lower body power": "lower_body",
+    "lower body": "lower_body",
+    "leg workout": "lower_body",
+    "legs": "lower_body",
+    "upper body and posture": "upper_body",
+    "upper body": "upper_body",
+    "arms workout": "upper_body",
+    "arms": "upper_body"
+}
+
+# Normalize intent names for consistency
+INTENT_NORMALIZATION = {
+    "begin workout": "start workout",
+    "start exercise": "start workout",
+    "end workout": "stop workout",
+    "finish workout": "stop workout",
+    "change exercise": "switch exercise",
+    "do exercise": "switch exercise",
+    "next exercise": "switch exercise",
+    "switch to exercise": "switch exercise",
+    "change to exercise": "switch exercise",
+    "start this exercise": "switch exercise",
+    "do this exercise": "switch exercise",
+    "pass": "skip exercise",
+    "next": "skip exercise",
+    "move on": "skip exercise",
+    "skip current exercise": "skip exercise",
+    "move to next exercise": "skip exercise",
+    "take rest": "add rest",
+    "break": "add rest",
+    "pause": "add rest",
+    "wait": "add rest",
+    "take a rest break": "add rest",
+    "need rest": "add rest",
+    "need a break": "add rest",
+    "begin routine": "start routine",
+    "do routine": "start routine"
+}
+
+ROUTINE_INTENTS = ["start routine", "begin routine", "do routine"]
+
+# Utterances reported with "high" confidence
+HIGH_CONFIDENCE_COMMANDS = {"start", "stop", "skip", "plank", "squat", "pushup", "bridge"}
+
+# Remove punctuation for better matching
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+GOLDEN_COMMANDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'commands_golden.json')
+
+
+# --- Multi-Pattern Matcher ---
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases. A scan reports every
+    phrase occurring anywhere in the text in a single left-to-right pass.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+        self._compiled = False
+
+    def add(self, phrase, payload):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(payload)
+        self._compiled = False
+
+    def compile(self):
+        # Breadth-first construction of failure links; each state inherits the
+        # outputs of its failure state so a scan never has to walk the chain.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._compiled = True
+        return self
+
+    def scan(self, text):
+        """Yields the payload of every phrase found in `text`."""
+        if not self._compiled:
+            self.compile()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                yield from outputs[state]
+
+
+def _best_matches(matcher, text):
+    """Scans once and keeps the highest-precedence (lowest rank) hit per category."""
+    best = {}
+    for category, rank, value in matcher.scan(text):
+        if category not in best or rank < best[category][0]:
+            best[category] = (rank, value)
+    return {category: value for category, (rank, value) in best.items()}
+
+
+def _compile_lower_matcher():
+    # Phrases, exercise entities and routines are matched against the lowercased text
+    matcher = PhraseMatcher()
+    for rank, (intent, phrases) in enumerate(PHRASE_RULES):
+        for phrase in phrases:
+            matcher.add(phrase, ("phrase", rank, intent))
+    for rank, exercise in enumerate(EXERCISE_ENTITIES):
+        entity = EXERCISE_ENTITY_NAMES.get(exercise.lower(), exercise.title())
+        matcher.add(exercise.lower(), ("exercise", rank, entity))
+    for rank, (routine_phrase, routine) in enumerate(ROUTINE_ENTITIES.items()):
+        matcher.add(routine_phrase.lower(), ("routine", rank, routine))
+    return matcher.compile()
+
+
+def _compile_clean_matcher():
+    # Exercise keywords and mishearings are matched against the punctuation-free text
+    matcher = PhraseMatcher()
+    for rank, keyword in enumerate(EXERCISE_KEYWORDS):
+        matcher.add(keyword, ("keyword", rank, KEYWORD_EXERCISES.get(keyword, keyword.title())))
+    for rank, (variation, actual) in enumerate(EXERCISE_MISHEARINGS.items()):
+        matcher.add(variation, ("mishearing", rank, KEYWORD_EXERCISES.get(actual, actual.title())))
+    return matcher.compile()
+
+
+_LOWER_MATCHER = _compile_lower_matcher()
+_CLEAN_MATCHER = _compile_clean_matcher()
+
+
+# --- Rule Matching ---
+class CommandMatch:
+    """Result of the rule-based stage for one transcription."""
+
+    def __init__(self, text, text_lower, text_clean, intent, entity, rule, lower_hits):
+        self.text = text
+        self.text_lower = text_lower
+        self.text_clean = text_clean
+        self.intent = intent
+        self.entity = entity
+        # "direct", "phrase", "keyword", "mishearing", or None when the rules missed
+        self.rule = rule
+        self._lower_hits = lower_hits
+
+    @property
+    def matched(self):
+        return self.intent is not None
+
+    def exercise_entity(self):
+        """First exercise from EXERCISE_ENTITIES mentioned in the text, if any."""
+        return self._lower_hits.get("exercise")
+
+    def routine_entity(self):
+        """First routine from ROUTINE_ENTITIES mentioned in the text, if any."""
+        return self._lower_hits.get("routine")
+
+
+def match_command(transcribed_text):
+    """Runs the rule-based grammar over a transcription."""
+    text_lower = transcribed_text.lower().strip()
+    text_clean = text_lower.translate(PUNCTUATION_TABLE)
+    lower_hits = _best_matches(_LOWER_MATCHER, text_lower)
+
+    # Check for direct matches first (using cleaned text)
+    if text_clean in SINGLE_WORD_COMMANDS:
+        intent = SINGLE_WORD_COMMANDS[text_clean]
+        entity = SINGLE_WORD_EXERCISES.get(text_clean) if intent == "switch exercise" else None
+        return CommandMatch(transcribed_text, text_lower, text_clean, intent, entity, "direct", lower_hits)
+
+    if "phrase" in lower_hits:
+        return CommandMatch(transcribed_text, text_lower, text_clean, lower_hits["phrase"], None, "phrase", lower_hits)
+
+    clean_hits = _best_matches(_CLEAN_MATCHER, text_clean)
+    for rule in ("keyword", "mishearing"):
+        if rule in clean_hits:
+            return CommandMatch(transcribed_text, text_lower, text_clean, "switch exercise", clean_hits[rule], rule, lower_hits)
+
+    return CommandMatch(transcribed_text, text_lower, text_clean, None, None, None, lower_hits)
+
+
+def command_phrases():
+    """Every command, exercise and routine phrase the grammar knows, for biasing speech recognition."""
+    phrases = set(SINGLE_WORD_COMMANDS) | set(EXERCISE_ENTITIES) | set(ROUTINE_ENTITIES) | set(INTENT_NORMALIZATION)
+    for _, group in PHRASE_RULES:
+        phrases.update(group)
+    return sorted(phrases)
+
+
+# Commands that make up a whole utterance on their own
+_WHOLE_COMMANDS = set(SINGLE_WORD_COMMANDS) | {phrase for _, group in PHRASE_RULES for phrase in group}
+_SENTENCE_END = (".", "!", "?")
+
+
+def command_complete(transcribed_text):
+    """
+    True when a partial transcription is a whole command sentence: a command
+    on its own, closed by sentence-final punctuation ("Next exercise."). A
+    command found inside longer text never counts, since a later phrase may
+    take precedence ("squats, then I need a break" is a stop command).
+    """
+    text = transcribed_text.strip()
+    if not text.endswith(_SENTENCE_END):
+        return False
+    return text.lower().translate(PUNCTUATION_TABLE).strip() in _WHOLE_COMMANDS
+
+
+def normalize_intent(intent):
+    return INTENT_NORMALIZATION.get(intent, intent)
+
+
+def build_command_response(match, intent=None):
+    """
+    Normalizes the intent, fills in a missing entity and formats the /api/speech
+    response. `intent` overrides the rule result (e.g. with the classifier's).
+    """
+    best_intent = intent if intent is not None else match.intent
+    entity = match.entity
+    normalized_intent = normalize_intent(best_intent)
+
+    # If no entity was set yet and this is a switch exercise command, try to extract it
+    if normalized_intent == "switch exercise" and not entity:
+        entity = match.exercise_entity()
+    elif normalized_intent in ROUTINE_INTENTS:
+        entity = match.routine_entity() or entity
+
+    return {
+        "intent": normalized_intent.upper().replace(" ", "_"),
+        "entity": entity,
+        "transcription": match.text,
+        "confidence": "high" if match.text_clean in HIGH_CONFIDENCE_COMMANDS else "medium"
+    }
+
+
+# --- Golden Table ---
+def load_golden_commands(path=GOLDEN_COMMANDS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def verify_golden_commands(path=GOLDEN_COMMANDS_PATH):
+    """
+    Replays the golden table through the grammar. Each case gives a transcription,
+    the classifier intent to assume when the rules miss ("classifier_intent"), and
+    the expected response (or null when the rules are expected to miss).
+    Returns a list of (case, actual) pairs that disagree.
+    """
+    failures = []
+    for case in load_golden_commands(path):
+        match = match_command(case["text"])
+        if case.get("classifier_intent") is None:
+            actual = build_command_response(match) if match.matched else None
+        else:
+            actual = None if match.matched else build_command_response(match, case["classifier_intent"])
+        if actual != case["expected"]:
+            failures.append((case, actual))
+    return failures
+
+
+if __name__ == '__main__':
+    cases = load_golden_commands()
+    failures = verify_golden_commands()
+    for case, actual in failures:
+        print(f"MISMATCH {case['text']!r}: expected {case['expected']}, got {actual}")
+    print(f"{len(cases) - len(failures)}/{len(cases)} golden commands match")
+    raise SystemExit(1 if failures else 0)
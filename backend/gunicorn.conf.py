@@ -0,0 +1,94 @@
+"""
+Production serving configuration. From the backend directory:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app (and both models) is loaded once in the gunicorn master, then worker
+processes are forked from it and share the model weights copy-on-write, so RAM
+grows far slower than the worker count. Each worker pins torch to its share of
+the CPU cores so workers don't oversubscribe them, and warms the models up with
+its own thread pool before serving.
+
+Environment variables:
+    WEB_WORKERS   worker processes (default: half the available cores)
+    WEB_THREADS   request threads per worker (default: 32)
+    PORT          listen port (default: 5000)
+    METRICS_DIR   directory the workers share their /api/metrics values through
+                  (default: a new temporary directory)
+"""
+import gc
+import glob
+import os
+import tempfile
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CORES = available_cores()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_WORKERS', max(1, CORES // 2)))
+# Torch intra-op threads per worker, so that workers x threads ~= cores
+TORCH_THREADS = max(1, CORES // workers)
+
+# Threaded workers: requests in one worker share the Whisper micro-batcher and
+# the admission gate (SPEECH_MAX_CONCURRENCY / SPEECH_MAX_QUEUE in app.py). Keep
+# enough threads that the gate, not gunicorn's accept queue, decides when to
+# shed load; WebSocket streams hold a thread each for their whole duration.
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 32))
+timeout = 120
+
+# Import app.py in the master so the models are loaded before forking
+preload_app = True
+
+# Read when app.py (and torch) is imported, i.e. before the models load
+os.environ.setdefault('MODELS_AUTOSTART', '0')
+os.environ.setdefault('OMP_NUM_THREADS', str(TORCH_THREADS))
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+# Each worker writes its metrics here so that /api/metrics covers all of them
+METRICS_DIR = os.environ.get('METRICS_DIR') or tempfile.mkdtemp(prefix='fitness-metrics-')
+
+
+def on_starting(server):
+    # Counts from a previous run of the server don't belong to this one
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    """Runs in the master after app.py is imported and before any worker is forked."""
+    import torch
+    import app
+
+    # Keep torch's OpenMP pool out of the master: a pool started before fork()
+    # is not usable in the children. The models load on background threads,
+    # which have all finished by the time load_all() returns, and warm-up
+    # (which starts the OpenMP pool) happens in each worker.
+    torch.set_num_threads(1)
+    if app.models.load_all(warmup=False):
+        server.log.info("Models loaded in master: %s", app.models.status())
+    else:
+        server.log.error("Models failed to load, workers will answer 503: %s", app.models.status())
+
+    # Move everything allocated so far out of the garbage collector's reach, so
+    # collections in the workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+    import app
+
+    torch.set_num_threads(TORCH_THREADS)
+    app.REGISTRY.share(METRICS_DIR)
+    app.models.warm_up()
+    server.log.info("Worker %s ready with %d torch threads", worker.pid, TORCH_THREADS)
@@ -0,0 +1,184 @@
+"""
+Deadlines, cancellation and per-session supersession for voice commands.
+
+Each /api/speech request becomes an InferenceJob that runs on the
+InferenceExecutor's thread pool while the request thread only waits for it.
+A job is cancelled when
+  - its deadline passes (the request answers 504 straight away), or
+  - a newer command arrives for the same client session (the older request
+    answers 409): at most one command per session is in flight.
+
+Cancellation takes effect between pipeline stages (decode, transcribe, resolve):
+a stage that has started runs to completion, but nothing after it does, and a
+clip still waiting for a Whisper batch is taken out of the queue. A command
+still queued for admission leaves the queue as soon as it is cancelled.
+"""
+import threading
+import time
+from concurrent.futures import CancelledError, Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Cancellation reasons
+DEADLINE_EXCEEDED = "deadline_exceeded"
+SUPERSEDED = "superseded"
+
+
+class JobCancelled(Exception):
+    """Raised where a cancelled job would have continued; `reason` says why."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class InferenceJob:
+    """One voice command on its way through the pipeline."""
+
+    def __init__(self, session=None, deadline_ms=None):
+        self.session = session
+        self.deadline = None if deadline_ms is None else time.monotonic() + deadline_ms / 1000.0
+        self.reason = None
+        # Set once the job has been registered as its session's command in flight
+        self.claimed = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left until the deadline (None: no deadline)."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason):
+        """Cancels the job and runs its on_cancel callbacks; False if it was already cancelled."""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return True
+
+    def on_cancel(self, callback):
+        """Calls `callback()` when the job is cancelled (right away if it already is)."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        """Raises JobCancelled if the job was cancelled or its deadline has passed; called between stages."""
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_EXCEEDED)
+        if self.reason is not None:
+            raise JobCancelled(self.reason)
+
+    def wait(self, future):
+        """Result of a queued unit of work (e.g. a Whisper batch slot), dropped from the queue if the job is cancelled."""
+        self.on_cancel(future.cancel)
+        try:
+            return future.result()
+        except CancelledError:
+            raise JobCancelled(self.reason)
+
+
+def _settle(future, result=None, exception=None):
+    # The job's outcome is set by whichever comes first: the pipeline or a cancellation
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class InferenceExecutor:
+    """
+    Runs jobs on a bounded thread pool, keeping at most one job per client session:
+    submitting a job cancels the session's previous one.
+    """
+
+    def __init__(self, max_workers, name="inference"):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix=name)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def run(self, job, fn):
+        """
+        Runs `fn(job)` on the pool and blocks until it returns, the job's deadline
+        passes or the job is cancelled (then JobCancelled is raised).
+        """
+        try:
+            job.check()
+        except JobCancelled:
+            # The job may have been claimed earlier (see admit())
+            self.release(job)
+            raise
+        self.claim(job)
+        outcome = Future()
+
+        def task():
+            try:
+                # Dropped here if cancelled (or out of time) while waiting for a thread
+                job.check()
+                _settle(outcome, result=fn(job))
+            except Exception as e:
+                _settle(outcome, exception=e)
+            finally:
+                self.release(job)
+
+        pool_future = self._pool.submit(task)
+
+        def cancelled():
+            pool_future.cancel()
+            self.release(job)
+            _settle(outcome, exception=JobCancelled(job.reason))
+
+        job.on_cancel(cancelled)
+        try:
+            return outcome.result(timeout=job.remaining())
+        except FutureTimeoutError:
+            job.cancel(DEADLINE_EXCEEDED)
+            raise JobCancelled(job.reason)
+
+    def admit(self, job, gate):
+        """
+        Claims `job` and queues it for a slot of `gate` (an AdmissionGate); False
+        when the queue is full. Raises JobCancelled if the job runs out of time or
+        is superseded while it waits. A job that isn't admitted is released.
+        """
+        self.claim(job)
+        job.on_cancel(gate.wake)
+        try:
+            if gate.try_enter(timeout=job.remaining(), cancelled=lambda: job.reason is not None):
+                return True
+            job.check()
+        except JobCancelled:
+            self.release(job)
+            raise
+        self.release(job)
+        return False
+
+    def claim(self, job):
+        """
+        Makes `job` its session's command in flight, cancelling the previous one.
+        run() claims too; admit() claims before waiting for admission, so queued
+        older commands are replaced as soon as a newer one arrives.
+        """
+        if job.session is None or job.claimed:
+            return
+        with self._lock:
+            job.claimed = True
+            previous = self._sessions.get(job.session)
+            self._sessions[job.session] = job
+        if previous is not None:
+            previous.cancel(SUPERSEDED)
+
+    def release(self, job):
+        """Forgets `job` as its session's command in flight (done, cancelled or never run)."""
+        if job.session is None:
+            return
+        with self._lock:
+            if self._sessions.get(job.session) is job:
+                del self._sessions[job.session]
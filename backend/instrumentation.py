@@ -0,0 +1,242 @@
+import bisect
+import copy
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+# --- Structured Logging ---
+
+def log_event(logger, level, event, **fields):
+    """
+    Logs `event` followed by key=value fields. Nothing is formatted unless the
+    logger is enabled for `level`, so debug events cost next to nothing in production.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s", event, " ".join(f"{key}={value!r}" for key, value in fields.items()))
+
+
+def configure_logging(level="INFO"):
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+
+
+# --- Metrics ---
+# A small in-process registry rendered in the Prometheus text exposition format.
+# Under gunicorn each worker has its own registry; with share() the workers
+# write their values to a common directory and any worker's scrape sums them.
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def snapshot(self):
+        """[label values, value] pairs, as written to the shared metrics directory."""
+        with self._lock:
+            return [[list(key), copy.deepcopy(value)] for key, value in self._values.items()]
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    @staticmethod
+    def _add(total, value):
+        return (total or 0.0) + value
+
+    def _render_value(self, key, value):
+        return [f"{self.name}_total{self._format_labels(key)} {value:g}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _add(total, value):
+        if total is None:
+            return value
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def _render_value(self, key, value):
+        bucket_counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', f'{bound:g}')])} {cumulative}")
+        lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {total:g}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self.directory = None
+        self._written = None
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        metric = Histogram(name, documentation, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def share(self, directory, interval=1.0):
+        """
+        Aggregates this registry with the other processes sharing `directory`:
+        its values are written there every `interval` seconds (and before each
+        render), and render() sums the files of every process. Files of exited
+        processes are kept, so totals don't go backwards when a worker restarts.
+        Call it in each worker process, after fork().
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._written = None
+
+        def flush_periodically():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except OSError:
+                    logging.getLogger(__name__).exception("Could not write metrics to %s", directory)
+
+        threading.Thread(target=flush_periodically, name="metrics-flush", daemon=True).start()
+
+    def flush(self):
+        """Writes this process's values to the shared directory (if they changed)."""
+        data = json.dumps({metric.name: metric.snapshot() for metric in self._metrics})
+        if data == self._written:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self._written = data
+
+    def _shared_values(self):
+        # Sums every process's values per metric and label set
+        totals = {metric.name: {} for metric in self._metrics}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric in self._metrics:
+                values = totals[metric.name]
+                for key, value in data.get(metric.name, ()):
+                    key = tuple(key)
+                    values[key] = metric._add(values.get(key), value)
+        return totals
+
+    def render(self):
+        totals = None
+        if self.directory is not None:
+            self.flush()
+            totals = self._shared_values()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(None if totals is None else totals[metric.name]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_AUDIO_BUCKETS = (0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 7.5, 10.0, 30.0)
+
+SPEECH_REQUESTS = REGISTRY.counter(
+    "speech_requests", "Speech command requests by route and HTTP status", ("route", "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "speech_request_seconds", "End-to-end speech command handling time", _LATENCY_BUCKETS, ("route",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "speech_stage_seconds", "Time spent per pipeline stage", _LATENCY_BUCKETS, ("stage",))
+RESOLUTIONS = REGISTRY.counter(
+    "speech_resolutions", "How commands were resolved: direct, phrase, keyword, mishearing, "
+    "classifier, unknown, rules_only (classifier skipped under load), no_speech or empty_transcription", ("path",))
+CLASSIFIER_CONFIDENCE = REGISTRY.histogram(
+    "intent_classifier_confidence", "Top-label confidence of the intent classifier fallback",
+    (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0), ("engine",))
+AUDIO_SECONDS = REGISTRY.histogram(
+    "speech_audio_seconds", "Duration of received audio clips", _AUDIO_BUCKETS)
+SPEECH_SECONDS = REGISTRY.histogram(
+    "speech_detected_seconds", "Duration of detected speech passed to ASR", _AUDIO_BUCKETS)
+BATCH_SIZE = REGISTRY.histogram(
+    "speech_asr_batch_size", "Clips per batched Whisper call", (1, 2, 4, 8, 16, 32))
+TIER_REQUESTS = REGISTRY.counter(
+    "speech_tier_requests", "Speech commands by the model tier that served them: full, lite or rules", ("tier",))
+ASR_EARLY_STOPS = REGISTRY.counter(
+    "speech_asr_early_stops", "Whisper batches stopped early because every clip held a complete command "
+    "(WHISPER_DECODING=command)")
+
+
+def observe_timings(timings):
+    """Feeds the per-stage millisecond timings of one request into STAGE_SECONDS."""
+    for stage, value in timings.items():
+        if isinstance(value, (int, float)):
+            STAGE_SECONDS.observe(value / 1000.0, stage=stage)
+
+
+def observe_audio(audio_stats):
+    AUDIO_SECONDS.observe(audio_stats["audio_ms"] / 1000.0)
+    if audio_stats["speech_ms"]:
+        SPEECH_SECONDS.observe(audio_stats["speech_ms"] / 1000.0)
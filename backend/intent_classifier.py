@@ -0,0 +1,223 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from models import apply_precision
+
+# --- Intent Classification Engines ---
+# Fallback used when the rule-based command grammar doesn't match. Two engines
+# share one output contract (a zero-shot style {'labels', 'scores'} result that
+# is gated and mapped to a standard intent below):
+#   - "bart":      zero-shot NLI with facebook/bart-large-mnli, one forward pass per label
+#   - "embedding": a sentence encoder; labels and example utterances are encoded once
+#                  at startup and each request only encodes the utterance itself
+
+# Use more specific labels that are less likely to default to rest
+CLASSIFICATION_LABELS = [
+    "switch to exercise", "change to exercise",
+    "start workout session", "begin workout",
+    "stop workout session", "end workout",
+    "skip current exercise", "next exercise",
+    "take a rest break", "need rest", "want rest", "request break"
+]
+
+# Map classifier labels back to our standard intents
+LABEL_INTENTS = {
+    "switch to exercise": "switch exercise",
+    "change to exercise": "switch exercise",
+    "start workout session": "start workout",
+    "begin workout": "start workout",
+    "stop workout session": "stop workout",
+    "end workout": "stop workout",
+    "skip current exercise": "skip exercise",
+    "next exercise": "skip exercise",
+    "take a rest break": "add rest",
+    "need rest": "add rest",
+    "want rest": "add rest",
+    "request break": "add rest"
+}
+
+# Only accept a classification if confidence is reasonable
+CONFIDENCE_THRESHOLD = 0.3
+
+# Example utterances per label for the embedding engine; each label is scored by
+# its closest example (the label text itself always counts as one)
+LABEL_EXAMPLES = {
+    "switch to exercise": ["switch to squats", "let's do planks now", "can we do lunges instead"],
+    "change to exercise": ["change the exercise", "I want a different exercise", "let's try another move"],
+    "start workout session": ["let's get started", "I'm ready to begin", "start the session"],
+    "begin workout": ["let's go", "kick off the workout", "time to train"],
+    "stop workout session": ["I'm done for today", "that's enough", "end the session"],
+    "end workout": ["finish up", "we're finished", "wrap it up"],
+    "skip current exercise": ["skip this one", "I don't want to do this one", "not this exercise"],
+    "next exercise": ["go to the next one", "move on", "what's next"],
+    "take a rest break": ["give me a minute", "hold on", "I need to catch my breath"],
+    "need rest": ["I'm tired", "I'm exhausted", "my legs are burning"],
+    "want rest": ["can I rest", "let me rest a bit", "more rest please"],
+    "request break": ["break time", "can we pause", "pause for a second"],
+}
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Softmax temperature turning cosine similarities into a label distribution, so the
+# 0.3 confidence gate means roughly the same thing for both engines
+EMBEDDING_TEMPERATURE = 0.05
+
+INTENT_EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_eval.json')
+
+
+def resolve_intent(intent_result):
+    """
+    Applies the confidence gate and label mapping to a classifier result.
+    Returns (intent, label, confidence).
+    """
+    if isinstance(intent_result, dict) and 'labels' in intent_result and intent_result['labels']:
+        label = intent_result['labels'][0]
+        confidence_score = intent_result['scores'][0] if 'scores' in intent_result else 0.0
+        if confidence_score > CONFIDENCE_THRESHOLD:
+            return LABEL_INTENTS.get(label, "UNKNOWN"), label, confidence_score
+        return "UNKNOWN", label, confidence_score
+    return "UNKNOWN", None, 0.0
+
+
+class ZeroShotIntentClassifier:
+    """The original BART-large-MNLI zero-shot path."""
+
+    name = "bart"
+
+    def __init__(self, model="facebook/bart-large-mnli", zero_shot_pipeline=None, precision="fp32"):
+        if zero_shot_pipeline is None:
+            from transformers import pipeline
+            zero_shot_pipeline = pipeline("zero-shot-classification", model=model)
+            zero_shot_pipeline.model = apply_precision(zero_shot_pipeline.model, precision)
+        self.pipeline = zero_shot_pipeline
+
+    @staticmethod
+    def context(text):
+        # Give BART better context by providing the full sentence with context
+        return f"User said: '{text}' during a fitness workout session"
+
+    def __call__(self, text):
+        return self.pipeline(self.context(text), CLASSIFICATION_LABELS)
+
+    def classify_batch(self, texts):
+        """Classifies several utterances in one pipeline call; returns one result per text."""
+        results = self.pipeline(
+            [self.context(text) for text in texts],
+            CLASSIFICATION_LABELS,
+            batch_size=len(CLASSIFICATION_LABELS)
+        )
+        return [results] if isinstance(results, dict) else list(results)
+
+
+class EmbeddingIntentClassifier:
+    """
+    Scores an utterance against a label matrix that is encoded once at startup.
+    A request costs one encoder pass plus a single matrix-vector product.
+    """
+
+    name = "embedding"
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL, label_examples=None, temperature=EMBEDDING_TEMPERATURE,
+                 precision="fp32"):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = apply_precision(AutoModel.from_pretrained(model).eval(), precision)
+        self.temperature = temperature
+
+        label_examples = LABEL_EXAMPLES if label_examples is None else label_examples
+        self.labels = list(CLASSIFICATION_LABELS)
+        texts, owners = [], []
+        for index, label in enumerate(self.labels):
+            for example in [label] + list(label_examples.get(label, [])):
+                texts.append(example)
+                owners.append(index)
+        self.example_matrix = self.encode(texts)
+        self.example_labels = np.array(owners)
+
+    def encode(self, texts):
+        """Mean-pooled, L2-normalized sentence embeddings as a (len(texts), dim) array."""
+        torch = self._torch
+        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            token_embeddings = self.model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+        pooled = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.float().numpy()
+
+    def __call__(self, text):
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts):
+        """Scores several utterances with one encoder pass; returns one result per text."""
+        texts = list(texts)
+        similarities = self.encode(texts) @ self.example_matrix.T
+
+        # Each label is scored by its best-matching example
+        label_scores = np.full((len(texts), len(self.labels)), -1.0, dtype=np.float32)
+        rows = np.arange(len(texts))[:, None]
+        np.maximum.at(label_scores, (rows, self.example_labels[None, :]), similarities)
+
+        logits = label_scores / self.temperature
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        results = []
+        for text, row in zip(texts, probabilities):
+            order = np.argsort(-row)
+            results.append({
+                "sequence": text,
+                "labels": [self.labels[i] for i in order],
+                "scores": [float(row[i]) for i in order]
+            })
+        return results
+
+
+def create_intent_classifier(engine="bart", **kwargs):
+    """Builds the intent classification engine selected by name ("bart" or "embedding")."""
+    if engine == "bart":
+        return ZeroShotIntentClassifier(**kwargs)
+    if engine == "embedding":
+        return EmbeddingIntentClassifier(**kwargs)
+    raise ValueError(f"Unknown intent classifier engine: {engine}")
+
+
+def compare_engines(engines=("bart", "embedding"), path=INTENT_EVAL_PATH):
+    """
+    Runs each engine over the labeled utterances in intent_eval.json and reports
+    accuracy and per-utterance latency.
+    """
+    with open(path) as f:
+        cases = json.load(f)
+
+    report = {}
+    for engine in engines:
+        start = time.perf_counter()
+        classifier = create_intent_classifier(engine)
+        load_seconds = time.perf_counter() - start
+
+        latencies, correct = [], 0
+        for case in cases:
+            start = time.perf_counter()
+            intent, _, _ = resolve_intent(classifier(case["text"]))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            correct += intent == case["intent"]
+
+        report[engine] = {
+            "accuracy": correct / len(cases),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "load_s": load_seconds,
+            "cases": len(cases)
+        }
+    return report
+
+
+if __name__ == '__main__':
+    print(json.dumps(compare_engines(), indent=2))
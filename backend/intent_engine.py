@@ -0,0 +1,89 @@
+import logging
+import time
+
+from commands import build_command_response, match_command
+from instrumentation import CLASSIFIER_CONFIDENCE, RESOLUTIONS, log_event
+from intent_classifier import resolve_intent
+
+logger = logging.getLogger(__name__)
+
+# resolve()'s default: the classifier returned by get_classifier
+ENGINE_CLASSIFIER = object()
+
+
+class IntentEngine:
+    """
+    The text -> command stage of the voice pipeline, usable without any audio.
+
+    Every utterance goes through the rule grammar (direct commands, phrases,
+    exercise keywords, mishearings); the rule misses of one call are sent to the
+    intent classifier together in a single batched call. Results are in the
+    /api/speech response shape, with intent normalization and entity extraction.
+    """
+
+    def __init__(self, get_classifier):
+        # Called per request, so a classifier that is (re)loaded later is picked up
+        self.get_classifier = get_classifier
+
+    def resolve(self, texts, timings=None, classifier=ENGINE_CLASSIFIER):
+        """
+        Resolves a list of utterances to command payloads; stage timings go into `timings`.
+        `classifier` replaces the engine's classifier for this call; None skips the
+        classifier fallback, so rule misses are UNKNOWN.
+        """
+        timings = {} if timings is None else timings
+        responses = [None] * len(texts)
+        matches, misses = {}, []
+
+        # --- Rule-Based Intent Matching ---
+        rules_start = time.perf_counter()
+        for index, text in enumerate(texts):
+            if not text:
+                RESOLUTIONS.inc(path="empty_transcription")
+                responses[index] = {"intent": "UNKNOWN", "entity": None, "transcription": ""}
+                continue
+            match = matches[index] = match_command(text)
+            if match.matched:
+                log_event(logger, logging.DEBUG, "rule_match", rule=match.rule, text=match.text_clean,
+                          intent=match.intent, entity=match.entity)
+                responses[index] = build_command_response(match)
+                RESOLUTIONS.inc(path=match.rule)
+            else:
+                misses.append(index)
+        timings['rules'] = (time.perf_counter() - rules_start) * 1000.0
+
+        if misses and classifier is None:
+            for index in misses:
+                RESOLUTIONS.inc(path="rules_only")
+                responses[index] = build_command_response(matches[index], "UNKNOWN")
+        elif misses:
+            if classifier is ENGINE_CLASSIFIER:
+                classifier = self.get_classifier()
+            self._classify(classifier, texts, misses, matches, responses, timings)
+
+        for response in responses:
+            log_event(logger, logging.DEBUG, "command", **response)
+        return responses
+
+    def resolve_one(self, text, timings=None, classifier=ENGINE_CLASSIFIER):
+        return self.resolve([text], timings, classifier)[0]
+
+    def _classify(self, classifier, texts, misses, matches, responses, timings):
+        # If no rule matched, try the intent classifier as last resort
+        classifier_start = time.perf_counter()
+        try:
+            intent_results = classifier.classify_batch([texts[index] for index in misses])
+        except Exception:
+            logger.exception("Intent classifier failed")
+            intent_results = [None] * len(misses)
+        timings['classifier'] = (time.perf_counter() - classifier_start) * 1000.0
+
+        for index, intent_result in zip(misses, intent_results):
+            # Only accept the result if confidence is reasonable, then map it to our standard intents
+            best_intent, label, confidence_score = resolve_intent(intent_result)
+            if intent_result is not None:
+                CLASSIFIER_CONFIDENCE.observe(confidence_score, engine=classifier.name)
+                log_event(logger, logging.DEBUG, "classification", engine=classifier.name, text=matches[index].text_clean,
+                          label=label, confidence=round(confidence_score, 3), intent=best_intent)
+            responses[index] = build_command_response(matches[index], best_intent)
+            RESOLUTIONS.inc(path="classifier" if best_intent != "UNKNOWN" else "unknown")
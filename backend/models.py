@@ -0,0 +1,298 @@
+import gc
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Model Lifecycle States ---
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+def synthetic_clip(seconds=1.0, sample_rate=16000):
+    """A short, quiet noise clip used to warm up speech models."""
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * sample_rate)) * 0.01).astype(np.float32)
+
+
+def model_size_mb(model):
+    """Memory held by the parameters and buffers of a loaded model, in MB (None if unknown)."""
+    # Pipelines keep the network in .model, intent classifiers in .model or .pipeline.model
+    for module in (getattr(model, "model", None), getattr(getattr(model, "pipeline", None), "model", None), model):
+        tensors = getattr(module, "parameters", None), getattr(module, "buffers", None)
+        if all(callable(tensor_fn) for tensor_fn in tensors):
+            total = sum(t.numel() * t.element_size() for tensor_fn in tensors for t in tensor_fn())
+            return total / (1024 * 1024)
+    return None
+
+
+class ModelEntry:
+    def __init__(self, name, loader, warmup=None, lazy=False, size_mb=None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        # Lazy models are only loaded on request (load()) and may be unloaded again
+        self.lazy = lazy
+        # Estimated until the model is loaded, then measured
+        self.size_mb = size_mb
+        self.last_used = None
+        # Requests using the model right now (see pin()); pinned models aren't unloaded
+        self.pins = 0
+        self.state = PENDING
+        self.model = None
+        self.error = None
+        self.warmup_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.ready_event = threading.Event()
+
+    def status(self):
+        status = {"state": self.state}
+        if self.lazy:
+            status["lazy"] = True
+        if self.size_mb is not None:
+            status["size_mb"] = round(self.size_mb, 1)
+        if self.load_seconds is not None:
+            status["load_s"] = round(self.load_seconds, 3)
+        if self.warmup_seconds is not None:
+            status["warmup_s"] = round(self.warmup_seconds, 3)
+        if self.error:
+            status["error"] = self.error
+        if self.warmup_error:
+            status["warmup_error"] = self.warmup_error
+        return status
+
+
+class ModelManager:
+    """
+    Loads the registered models concurrently on background threads so the web
+    server can bind and answer health checks while they load. Each model goes
+    pending -> loading -> warming -> ready (or failed), and a warm-up call on
+    synthetic input runs before a model is marked ready so the first real request
+    doesn't pay for lazy kernel initialization.
+
+    Models registered with lazy=True (e.g. optional smaller tiers) are left out of
+    start(), readiness and wait(); they are loaded on demand with load() and can
+    be dropped again with unload().
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, warmup=None, lazy=False, size_mb=None):
+        """
+        Registers `loader()` -> model, with an optional `warmup(model)` call.
+        `size_mb` is the memory estimate used for lazy models until they are loaded.
+        """
+        with self._lock:
+            self._entries[name] = ModelEntry(name, loader, warmup, lazy, size_mb)
+
+    def start(self, warmup=True):
+        """
+        Starts loading every pending model in the background; returns immediately.
+        With warmup=False models are marked ready straight after loading (see warm_up()).
+        """
+        self._start([entry for entry in self._entries.values() if not entry.lazy], warmup)
+
+    def load(self, *names, warmup=True):
+        """Starts loading the named models (lazy or not) in the background if they aren't loaded."""
+        self._start([self._entries[name] for name in names], warmup)
+
+    def _start(self, entries, warmup):
+        with self._lock:
+            pending = [entry for entry in entries if entry.state == PENDING]
+            for entry in pending:
+                entry.state = LOADING
+        # A thread per load rather than a shared pool: a pool created in the
+        # gunicorn master would be inherited by the workers without its threads
+        for entry in pending:
+            threading.Thread(target=self._load, args=(entry, warmup), name=f"model-loader-{entry.name}", daemon=True).start()
+
+    def load_all(self, warmup=True):
+        """Loads every pending model and blocks until all are ready or failed."""
+        self.start(warmup)
+        return self.wait()
+
+    def _load(self, entry, warmup=True):
+        logger.info("Loading model '%s'...", entry.name)
+        start = time.perf_counter()
+        try:
+            model = entry.loader()
+        except Exception as e:
+            entry.load_seconds = time.perf_counter() - start
+            entry.error = str(e)
+            entry.state = FAILED
+            logger.critical("Could not load model '%s': %s", entry.name, e)
+            entry.ready_event.set()
+            return
+        entry.load_seconds = time.perf_counter() - start
+        entry.model = model
+        entry.size_mb = model_size_mb(model) or entry.size_mb
+        entry.last_used = time.monotonic()
+
+        if warmup:
+            entry.state = WARMING
+            self._warm_up(entry)
+
+        entry.state = READY
+        logger.info("Model '%s' ready (load %.1fs, warm-up %.1fs).", entry.name, entry.load_seconds, entry.warmup_seconds or 0)
+        entry.ready_event.set()
+
+    def _warm_up(self, entry):
+        if entry.warmup is None:
+            return
+        start = time.perf_counter()
+        try:
+            entry.warmup(entry.model)
+        except Exception as e:
+            # A failed warm-up only costs latency on the first request
+            entry.warmup_error = str(e)
+            logger.warning("Warm-up of model '%s' failed: %s", entry.name, e)
+        entry.warmup_seconds = time.perf_counter() - start
+
+    def warm_up(self, *names):
+        """Runs the warm-up call of the named (default: all) ready models in this thread."""
+        for name in names or tuple(self._entries):
+            entry = self._entries[name]
+            if entry.state == READY:
+                self._warm_up(entry)
+
+    def unload(self, name):
+        """
+        Drops a loaded (or failed) model so its memory can be reclaimed; it goes back
+        to pending and can be loaded again. Returns the MB released (an estimate), or
+        0 when the model wasn't loaded or is pinned by a request in flight.
+        """
+        with self._lock:
+            entry = self._entries[name]
+            if entry.state not in (READY, FAILED) or entry.pins:
+                return 0
+            released = (entry.size_mb or 0) if entry.state == READY else 0
+            entry.state = PENDING
+            entry.model = None
+            entry.error = entry.warmup_error = None
+            entry.ready_event.clear()
+        gc.collect()
+        logger.info("Model '%s' unloaded (%.0f MB).", name, released)
+        return released
+
+    def get(self, name):
+        """The loaded model, or None if it isn't ready (yet)."""
+        entry = self._entries.get(name)
+        if entry is None or entry.state != READY:
+            return None
+        entry.last_used = time.monotonic()
+        return entry.model
+
+    def pin(self, name):
+        """
+        Marks a ready model as in use, so unload() leaves it loaded until the
+        matching unpin(); False (and nothing pinned) if it isn't ready.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.state != READY:
+                return False
+            entry.pins += 1
+            entry.last_used = time.monotonic()
+            return True
+
+    def unpin(self, name):
+        with self._lock:
+            entry = self._entries[name]
+            entry.pins = max(0, entry.pins - 1)
+            entry.last_used = time.monotonic()
+
+    def is_pinned(self, name):
+        return self._entries[name].pins > 0
+
+    def state(self, name):
+        return self._entries[name].state
+
+    def idle_seconds(self, name):
+        """Seconds since the named model was loaded or last handed out by get()."""
+        entry = self._entries[name]
+        return None if entry.last_used is None else time.monotonic() - entry.last_used
+
+    def loaded_mb(self):
+        """Estimated memory of every model that is loaded or loading."""
+        return sum(entry.size_mb or 0 for entry in self._entries.values() if entry.state in (LOADING, WARMING, READY))
+
+    def size_mb(self, name):
+        return self._entries[name].size_mb
+
+    def _required(self):
+        return tuple(name for name, entry in self._entries.items() if not entry.lazy)
+
+    def is_ready(self, *names):
+        names = names or self._required()
+        return all(name in self._entries and self._entries[name].state == READY for name in names)
+
+    def wait(self, *names, timeout=None):
+        """Blocks until the named models (default: all non-lazy ones) are ready or failed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or self._required():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._entries[name].ready_event.wait(remaining):
+                return False
+        return self.is_ready(*names)
+
+    def status(self):
+        return {name: entry.status() for name, entry in self._entries.items()}
+
+    def overall_state(self):
+        """"ready" when every non-lazy model is ready, "failed" if any failed, otherwise "starting"."""
+        states = [self._entries[name].state for name in self._required()]
+        if all(state == READY for state in states):
+            return READY
+        if any(state == FAILED for state in states):
+            return FAILED
+        return "starting"
+
+
+# --- Inference Precision ---
+# fp32: full precision (default)
+# int8: dynamic int8 quantization of every nn.Linear (weights stored as int8,
+#       activations quantized on the fly); the usual CPU speed/memory win
+# bf16: bfloat16 weights and activations; only worthwhile on CPUs with native
+#       bf16 support (AVX512-BF16 / AMX)
+INFERENCE_PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def _logits_to_float(module, inputs, outputs):
+    # Pipelines convert logits to NumPy, which has no bfloat16
+    if hasattr(outputs, "logits") and outputs.logits is not None:
+        outputs["logits"] = outputs.logits.float()
+    return outputs
+
+
+def apply_precision(model, precision):
+    """Returns `model` (a torch.nn.Module) converted to the requested inference precision."""
+    if precision not in INFERENCE_PRECISIONS:
+        raise ValueError(f"Unknown inference precision '{precision}', expected one of {INFERENCE_PRECISIONS}")
+    if precision == "fp32":
+        return model
+
+    import torch
+    model.eval()
+    if precision == "int8":
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    model = model.to(torch.bfloat16)
+    model.register_forward_hook(_logits_to_float)
+    return model
+
+
+def precision_dtype(precision):
+    """The torch dtype pipelines should cast their inputs to for `precision`, or None."""
+    if precision == "bf16":
+        import torch
+        return torch.bfloat16
+    return None
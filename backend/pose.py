@@ -0,0 +1,551 @@
+import argparse
+import json
+import math
+import numbers
+import os
+import sys
+import time
+
+import numpy as np
+
+from commands import EXERCISE_ENTITY_NAMES
+
+# --- Keypoint Layout ---
+# Sessions are (frames x 17 x 3) arrays of [x, y, score] per keypoint, in the
+# MoveNet / COCO order returned by @tensorflow-models/pose-detection.
+KEYPOINT_NAMES = [
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle"
+]
+KEYPOINT = {name: index for index, name in enumerate(KEYPOINT_NAMES)}
+X, Y, SCORE = 0, 1, 2
+
+# A keypoint only counts as seen above this confidence (as in poseEvaluator.js)
+MIN_KEYPOINT_SCORE = 0.5
+
+# Joint angles computed for every session, as (first point, vertex, last point)
+JOINT_ANGLES = {
+    "left_elbow": ("left_shoulder", "left_elbow", "left_wrist"),
+    "right_elbow": ("right_shoulder", "right_elbow", "right_wrist"),
+    "left_hip": ("left_shoulder", "left_hip", "left_knee"),
+    "right_hip": ("right_shoulder", "right_hip", "right_knee"),
+    "left_knee": ("left_hip", "left_knee", "left_ankle"),
+    "right_knee": ("right_hip", "right_knee", "right_ankle"),
+    "left_body_line": ("left_shoulder", "left_hip", "left_ankle"),
+    "right_body_line": ("right_shoulder", "right_hip", "right_ankle")
+}
+_ANGLE_NAMES = list(JOINT_ANGLES)
+_ANGLE_POINTS = np.array([[KEYPOINT[point] for point in JOINT_ANGLES[name]] for name in _ANGLE_NAMES])
+
+# Frame rate of the browser evaluation loop (VideoFeed.js evaluates every 100ms)
+DEFAULT_FPS = 10
+
+POSE_PARITY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pose_parity.json')
+
+
+def as_keypoint_array(keypoints):
+    """Validates keypoints as a float (frames x 17 x 3) array; flat 51-value rows are accepted too."""
+    array = np.asarray(keypoints, dtype=np.float64)
+    if array.size == 0:
+        # A session with no frames (e.g. the camera never found the user)
+        array = array.reshape(0, len(KEYPOINT_NAMES), 3)
+    elif array.ndim == 2 and array.shape[1] == 3 * len(KEYPOINT_NAMES):
+        array = array.reshape(len(array), len(KEYPOINT_NAMES), 3)
+    elif array.ndim == 2 and array.shape == (len(KEYPOINT_NAMES), 3):
+        array = array[np.newaxis]
+    if array.ndim != 3 or array.shape[1:] != (len(KEYPOINT_NAMES), 3):
+        raise ValueError(f"Keypoints must be shaped (frames, 17, 3), got {array.shape}")
+    return array
+
+
+def joint_angles(keypoints):
+    """
+    Every angle in JOINT_ANGLES, in degrees, for all frames at once. Uses the law
+    of cosines exactly like calculateAngle in poseEvaluator.js, so degenerate
+    joints (two points on top of each other) give NaN there as well.
+    """
+    points = keypoints[:, _ANGLE_POINTS, :2]
+    first, vertex, last = points[:, :, 0], points[:, :, 1], points[:, :, 2]
+    a = np.sqrt(((vertex - first) ** 2).sum(axis=-1))
+    b = np.sqrt(((vertex - last) ** 2).sum(axis=-1))
+    c = np.sqrt(((last - first) ** 2).sum(axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        degrees = np.arccos((a ** 2 + b ** 2 - c ** 2) / (2 * a * b)) * (180 / np.pi)
+    return {name: degrees[:, index] for index, name in enumerate(_ANGLE_NAMES)}
+
+
+class Frames:
+    """Per-frame views of one session used by the exercise rules."""
+
+    def __init__(self, keypoints):
+        self.keypoints = keypoints
+        self.angles = joint_angles(keypoints)
+        self.seen = keypoints[:, :, SCORE] > MIN_KEYPOINT_SCORE
+
+    def __len__(self):
+        return len(self.keypoints)
+
+    def visible(self, *names):
+        return np.logical_and.reduce([self.seen[:, KEYPOINT[name]] for name in names])
+
+    def x(self, name):
+        return self.keypoints[:, KEYPOINT[name], X]
+
+    def y(self, name):
+        return self.keypoints[:, KEYPOINT[name], Y]
+
+
+# --- Stage Machine ---
+# The rep exercises share one up/down machine: a rep is counted when a frame
+# moves the stage up while it was down. A session that starts without a stage
+# takes its first one from the first frame that can initialize it.
+NO_STAGE, UP, DOWN = 0, 1, -1
+STAGE_NAMES = {UP: "up", DOWN: "down"}
+
+
+def stage_code(stage):
+    return UP if stage == "up" else DOWN if stage == "down" else NO_STAGE
+
+
+def run_stages(up, down, init_up, init_down, stage=None, rep_count=0):
+    """
+    Runs the stage machine over a whole session without a per-frame loop: the
+    stage after each frame is the last up/down event so far. Returns (current,
+    after, reps): the stage each frame's rules see (after initialization), the
+    stage after each frame and the rep count after each frame.
+    """
+    start = stage_code(stage)
+    frames = len(up)
+    event = np.where(up, UP, np.where(down, DOWN, NO_STAGE)).astype(np.int8)
+    if start == NO_STAGE:
+        initializing = init_up | init_down
+        first = int(np.argmax(initializing)) if initializing.any() else frames
+        event[:first] = NO_STAGE
+        if first < frames:
+            event[first] = UP if init_up[first] else DOWN
+
+    latest = np.where(event != NO_STAGE, np.arange(frames), -1)
+    np.maximum.accumulate(latest, out=latest)
+    after = np.where(latest >= 0, event[np.maximum(latest, 0)], start)
+    before = np.concatenate(([start], after[:-1])).astype(after.dtype)
+    current = np.where(before == NO_STAGE, after, before)
+    reps = rep_count + np.cumsum((event == UP) & (before == DOWN))
+    return current, after, reps
+
+
+def select_feedback(rules, default):
+    """
+    Picks each frame's feedback from (condition, (feedback, color)) rules, first
+    match wins. Returns (index per frame, messages).
+    """
+    messages = [message for _, message in rules] + [default]
+    return np.select([condition for condition, _ in rules], list(range(len(rules))), len(rules)), messages
+
+
+# --- Repetition-Based Evaluations ---
+# Each returns the up/down/init events for run_stages and a function building
+# the feedback rules from the stage each frame sees.
+
+def pushup_rules(frames):
+    visible = frames.visible("left_shoulder", "left_elbow", "left_wrist")
+    elbow = frames.angles["left_elbow"]
+
+    # Elbows too wide relative to the shoulders
+    with np.errstate(divide='ignore', invalid='ignore'):
+        flare_ratio = np.abs(frames.x("right_elbow") - frames.x("left_elbow")) / \
+            np.abs(frames.x("right_shoulder") - frames.x("left_shoulder"))
+    flare = visible & frames.visible("right_shoulder", "right_elbow") & (flare_ratio > 1.4)
+    # Straight line from shoulders to knees
+    misaligned = visible & frames.visible("left_hip", "left_knee") & ~(frames.angles["left_hip"] > 160)
+
+    valid = visible & ~misaligned & ~flare
+    up = valid & (elbow > 160)
+    down = valid & (elbow < 70)
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Position yourself so your arms and shoulders are fully visible.", "orange")),
+            (misaligned, ("Keep your spine straight! Form a straight line from head to heels.", "red")),
+            (flare, ("Keep your elbows closer to your body! Don't flare them out too much.", "orange")),
+            (up & (current == DOWN), ("Excellent push-up! 🎉", "green")),
+            (up & (elbow > 170), ("Perfect plank position! Now lower down slowly.", "green")),
+            (up, ("Good! Fully extend your arms.", "green")),
+            (down & (elbow < 60), ("Perfect depth! Chest almost touches ground. Push up!", "green")),
+            (down, ("Good! Lower your chest closer to the ground.", "yellow")),
+            ((current == UP) & (elbow < 120), ("Keep lowering... get your chest closer to the ground!", "blue")),
+            (current == UP, ("Start lowering down slowly...", "cyan")),
+            ((current == DOWN) & (elbow > 120), ("Keep pushing up... fully extend your arms!", "blue")),
+            (current == DOWN, ("Good! Now push up with control.", "cyan"))
+        ], ("Get into high plank position with arms fully extended.", "orange"))
+
+    return up, down, up, down, feedback
+
+
+def squat_rules(frames):
+    visible = frames.visible("left_hip", "left_knee", "left_ankle")
+    knee = frames.angles["left_knee"]
+    hip_y, knee_y = frames.y("left_hip"), frames.y("left_knee")
+
+    up = visible & (knee > 160)
+    # Must squat deep AND get the hips low
+    down = visible & (knee < 100) & (hip_y >= knee_y - 0.02)
+    init_down = visible & (knee < 100)
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Make sure your legs are fully visible.", "orange")),
+            (up & (current == DOWN), ("Good Rep! ", "green")),
+            (up & (knee > 170), ("Perfect standing position. Now squat down!", "green")),
+            (up, ("Good! Stand up fully straight.", "green")),
+            (down & (hip_y >= knee_y), ("Perfect squat depth! Now stand up.", "green")),
+            (down, ("Almost there! Get your hips just below knee level.", "yellow")),
+            ((current == UP) & (knee < 140), ("Keep going down... squat deeper!", "blue")),
+            (current == UP, ("Start squatting down...", "cyan")),
+            ((current == DOWN) & (knee > 120), ("Push up through your heels... stand up fully!", "blue")),
+            (current == DOWN, ("Good depth! Now stand up completely.", "cyan"))
+        ], ("Stand up straight to begin, then squat down deep.", "orange"))
+
+    return up, down, up, init_down, feedback
+
+
+def bridge_rules(frames):
+    visible = frames.visible("left_shoulder", "left_hip", "left_knee")
+    hip = frames.angles["left_hip"]
+    up = visible & (hip > 150)
+    down = visible & (hip < 120)
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Make sure your side profile is visible.", "orange")),
+            (up & (current == DOWN), ("Perfect bridge! Now lower down.", "green")),
+            (up, ("Great bridge position! Hold briefly, then lower.", "green")),
+            (down, ("Good starting position. Now lift your hips up!", "cyan")),
+            (current == UP, ("Keep lowering...", "blue")),
+            (current == DOWN, ("Keep lifting your hips up...", "blue"))
+        ], ("Lie flat, then lift your hips to form a bridge.", "cyan"))
+
+    return up, down, up, down, feedback
+
+
+def lunge_rules(frames):
+    visible = frames.visible("left_hip", "left_knee", "left_ankle")
+    knee = frames.angles["left_knee"]
+    up = visible & (knee > 140)
+    down = visible & (knee < 110)
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Make sure your legs are fully visible.", "orange")),
+            (up & (current == DOWN), ("Perfect lunge! Step into the next one.", "green")),
+            (up, ("Good standing position. Now step into a lunge.", "green")),
+            (down & (knee < 90), ("Great depth! Now step back up.", "green")),
+            (down, ("Lower! Get that front thigh parallel to the ground.", "yellow")),
+            (current == UP, ("Keep stepping forward and down...", "blue")),
+            (current == DOWN, ("Push back up to standing...", "blue"))
+        ], ("Step forward into a lunge position.", "cyan"))
+
+    return up, down, up, down, feedback
+
+
+def high_knees_rules(frames):
+    visible = frames.visible("left_hip", "left_knee", "right_hip", "right_knee")
+    hip_y = (frames.y("left_hip") + frames.y("right_hip")) / 2
+    left_knee_y, right_knee_y = frames.y("left_knee"), frames.y("right_knee")
+    # Either knee at least 20 pixels above hip level
+    up = visible & ((left_knee_y < hip_y - 20) | (right_knee_y < hip_y - 20))
+    down = visible & ~up
+    partial = (left_knee_y < hip_y + 20) | (right_knee_y < hip_y + 20)
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Make sure you are fully visible.", "orange")),
+            (up & (current == DOWN), ("Great knee lift! Keep marching!", "green")),
+            (up, ("Perfect! Keep bringing those knees up!", "green")),
+            (partial, ("Higher! Bring your knees up to hip level!", "yellow"))
+        ], ("March in place! Lift those knees high!", "cyan"))
+
+    return up, down, up, down, feedback
+
+
+def superman_rules(frames):
+    visible = frames.visible("left_shoulder", "left_hip", "left_ankle", "left_wrist")
+    # Wrists above shoulders and ankles above hips, by at least 10 pixels
+    arms_lifted = frames.y("left_wrist") < frames.y("left_shoulder") - 10
+    legs_lifted = frames.y("left_ankle") < frames.y("left_hip") - 10
+    up = visible & arms_lifted & legs_lifted
+    down = visible & ~up
+
+    def feedback(current):
+        return select_feedback([
+            (~visible, ("Make sure you are fully visible from the side.", "orange")),
+            (up & (current == DOWN), ("Great lift! Now lower back down.", "green")),
+            (up, ("Perfect form! Hold briefly, then lower down.", "green")),
+            (arms_lifted & ~legs_lifted, ("Good! Now lift your legs too.", "blue")),
+            (~arms_lifted & legs_lifted, ("Good! Now lift your arms and chest too.", "blue"))
+        ], ("Ready position. Now lift your arms, chest, and legs together!", "cyan"))
+
+    return up, down, up, down, feedback
+
+
+# --- Duration-Based Evaluations ---
+# Each returns (correct form per frame, feedback index per frame, messages).
+
+def plank_rules(frames):
+    visible = frames.visible("left_shoulder", "left_hip", "left_ankle")
+    body = frames.angles["left_body_line"]
+    too_low, too_high = visible & (body < 160), visible & (body > 195)
+    indices, messages = select_feedback([
+        (~visible, ("Make sure your full body is visible.", "orange")),
+        (too_low, ("Hips too low. Raise your hips!", "red")),
+        (too_high, ("Hips too high. Lower your hips!", "red"))
+    ], ("Great form! Hold it.", "green"))
+    return visible & ~too_low & ~too_high, indices, messages
+
+
+def wall_sit_rules(frames):
+    visible = frames.visible("left_hip", "left_knee", "left_ankle")
+    knee = frames.angles["left_knee"]
+    too_high, too_low = visible & (knee > 110), visible & (knee < 70)
+    indices, messages = select_feedback([
+        (~visible, ("Make sure your side profile is visible.", "orange")),
+        (too_high, ("Lower your hips!", "red")),
+        (too_low, ("Raise your hips slightly!", "red"))
+    ], ("Great form, keep holding!", "green"))
+    return visible & ~too_high & ~too_low, indices, messages
+
+
+def bird_dog_rules(frames):
+    visible = frames.visible("left_shoulder", "right_shoulder", "left_hip", "right_hip")
+    tilted = visible & (
+        (np.abs(frames.y("left_shoulder") - frames.y("right_shoulder")) > 30) |
+        (np.abs(frames.y("left_hip") - frames.y("right_hip")) > 30)
+    )
+    indices, messages = select_feedback([
+        (~visible, ("Make sure you are fully visible.", "orange")),
+        (tilted, ("Keep your hips and shoulders level!", "red"))
+    ], ("Great stability! Hold it.", "green"))
+    return visible & ~tilted, indices, messages
+
+
+# Exercise names as used by the frontend (VideoFeed.js)
+REP_EXERCISES = {
+    "Push-up": pushup_rules,
+    "Squat": squat_rules,
+    "Bridge": bridge_rules,
+    "Lunges": lunge_rules,
+    "High Knees": high_knees_rules,
+    "Superman": superman_rules
+}
+HOLD_EXERCISES = {
+    "Plank": plank_rules,
+    "Wall-sit": wall_sit_rules,
+    "Bird-dog": bird_dog_rules
+}
+
+
+def _exercise_key(name):
+    return "".join(char for char in str(name).lower() if char.isalnum())
+
+
+# Frontend names plus every spoken variation the voice commands know
+_EXERCISE_LOOKUP = {_exercise_key(variation): name for variation, name in EXERCISE_ENTITY_NAMES.items()}
+_EXERCISE_LOOKUP.update({_exercise_key(name): name for name in list(REP_EXERCISES) + list(HOLD_EXERCISES)})
+
+
+def exercise_name(name):
+    """The frontend exercise name for `name` ("pushups", "push up" -> "Push-up")."""
+    canonical = _EXERCISE_LOOKUP.get(_exercise_key(name))
+    if canonical is None:
+        raise ValueError(f"No pose evaluation for exercise '{name}'")
+    return canonical
+
+
+def longest_run(mask):
+    """Length of the longest run of True values."""
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def as_rep_count(value):
+    """A starting rep count as an int; ValueError unless it is a non-negative whole number."""
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or not 0 <= value < math.inf or value != int(value):
+        raise ValueError(f"rep_count must be a non-negative integer, got {value!r}")
+    return int(value)
+
+
+def as_fps(value):
+    """A frame rate as a float; ValueError unless it is a positive, finite number."""
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or not 0 < value < math.inf:
+        raise ValueError(f"fps must be a positive number, got {value!r}")
+    return float(value)
+
+
+def evaluate_session(exercise, keypoints, stage=None, rep_count=0, fps=DEFAULT_FPS, per_frame=False):
+    """
+    Re-scores a recorded session with the same rules as the browser. Rep
+    exercises report the rep count and final stage (starting from `stage` and
+    `rep_count`); hold exercises report how long the form was correct. With
+    per_frame=True the per-frame results are included in the poseEvaluator.js
+    shape.
+    """
+    exercise = exercise_name(exercise)
+    rep_count = as_rep_count(rep_count)
+    fps = as_fps(fps)
+    frames = Frames(as_keypoint_array(keypoints))
+    summary = {"exercise": exercise, "frames": len(frames)}
+
+    if exercise in REP_EXERCISES:
+        up, down, init_up, init_down, feedback = REP_EXERCISES[exercise](frames)
+        current, after, reps = run_stages(up, down, init_up, init_down, stage, rep_count)
+        final = int(after[-1]) if len(frames) else stage_code(stage)
+        summary.update({
+            "rep_count": int(reps[-1]) if len(frames) else rep_count,
+            "new_reps": int(reps[-1] - rep_count) if len(frames) else 0,
+            "stage": STAGE_NAMES.get(final, stage),
+            "rep_frames": np.flatnonzero(np.diff(np.concatenate(([rep_count], reps)))).tolist()
+        })
+        if per_frame:
+            indices, messages = feedback(current)
+            stages = [STAGE_NAMES.get(code, stage) for code in after.tolist()]
+            summary["frames_detail"] = [
+                {"stage": frame_stage, "repCount": count, "feedback": messages[index][0], "feedbackColor": messages[index][1]}
+                for frame_stage, count, index in zip(stages, reps.tolist(), indices.tolist())
+            ]
+        return summary
+
+    correct, indices, messages = HOLD_EXERCISES[exercise](frames)
+    summary.update({
+        "correct_frames": int(correct.sum()),
+        "correct_fraction": float(correct.mean()) if len(frames) else 0.0,
+        "hold_seconds": float(correct.sum()) / fps,
+        "longest_hold_seconds": longest_run(correct) / fps
+    })
+    if per_frame:
+        summary["frames_detail"] = [
+            {"isCorrectForm": is_correct, "feedback": messages[index][0], "feedbackColor": messages[index][1]}
+            for is_correct, index in zip(correct.tolist(), indices.tolist())
+        ]
+    return summary
+
+
+def evaluate_request(session, per_frame=False):
+    """Evaluates a session given as a dict: {"exercise", "keypoints", optional "stage", "rep_count", "fps", "id"}."""
+    if not isinstance(session, dict) or "exercise" not in session or "keypoints" not in session:
+        raise ValueError('A session needs "exercise" and "keypoints" (frames x 17 x [x, y, score]).')
+    result = evaluate_session(
+        session["exercise"],
+        session["keypoints"],
+        stage=session.get("stage"),
+        rep_count=session.get("rep_count", 0),
+        fps=session.get("fps", DEFAULT_FPS),
+        per_frame=per_frame or bool(session.get("per_frame", False))
+    )
+    if "id" in session:
+        result = dict({"id": session["id"]}, **result)
+    return result
+
+
+# --- Parity With poseEvaluator.js ---
+
+def verify_parity(path=POSE_PARITY_PATH):
+    """
+    Replays the sessions recorded from the browser rules by
+    frontend/src/tests/evaluation/poseParityFixture.js. Returns (frames checked,
+    list of (session index, frame, expected, actual) mismatches).
+    """
+    with open(path) as f:
+        fixture = json.load(f)
+    messages = fixture["messages"]
+
+    checked, mismatches = 0, []
+    for session_index, session in enumerate(fixture["sessions"]):
+        keypoints = np.asarray(session["keypoints"], dtype=np.float64).reshape(-1, len(KEYPOINT_NAMES), 3)
+        keypoints[:, :, SCORE] /= 100
+        result = evaluate_session(session["exercise"], keypoints, session["stage"], session["repCount"], per_frame=True)
+        for frame, (expected, actual) in enumerate(zip(session["expected"], result["frames_detail"])):
+            if session["exercise"] in REP_EXERCISES:
+                stage, count, message = expected
+                expected = {"stage": stage, "repCount": count, "feedback": messages[message][0], "feedbackColor": messages[message][1]}
+            else:
+                is_correct, message = expected
+                expected = {"isCorrectForm": is_correct, "feedback": messages[message][0], "feedbackColor": messages[message][1]}
+            checked += 1
+            if expected != actual:
+                mismatches.append((session_index, frame, expected, actual))
+    return checked, mismatches
+
+
+# --- Command Line ---
+
+def load_sessions(path, exercise=None):
+    """
+    Yields session dicts from a .jsonl (one session per line), .json (a session
+    or a list of them), .npy (keypoints only; needs `exercise`) or .npz file
+    (a "keypoints" array plus optional "exercise").
+    """
+    name = os.path.basename(path)
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    session = json.loads(line)
+                    session.setdefault("id", f"{name}:{line_number}")
+                    yield session
+        return
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        sessions = data if isinstance(data, list) else [data]
+        for index, session in enumerate(sessions):
+            session.setdefault("id", f"{name}:{index}" if len(sessions) > 1 else name)
+            yield session
+        return
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            session_exercise = str(data["exercise"]) if "exercise" in data else exercise
+            yield {"id": name, "exercise": session_exercise, "keypoints": data["keypoints"]}
+        return
+    yield {"id": name, "exercise": exercise, "keypoints": np.load(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score recorded pose sessions with the form evaluation rules.")
+    parser.add_argument('paths', nargs='*', help=".jsonl, .json, .npy or .npz session files")
+    parser.add_argument('--exercise', help="exercise for sessions that don't name one (e.g. .npy files)")
+    parser.add_argument('--frames', action='store_true', help="include per-frame feedback in the output")
+    parser.add_argument('--parity', action='store_true', help="check the rules against pose_parity.json")
+    args = parser.parse_args()
+
+    if args.parity:
+        checked, mismatches = verify_parity()
+        for session_index, frame, expected, actual in mismatches[:20]:
+            print(f"MISMATCH session {session_index} frame {frame}: expected {expected}, got {actual}")
+        print(f"{checked - len(mismatches)}/{checked} frames match the browser rules")
+        raise SystemExit(1 if mismatches else 0)
+
+    if not args.paths:
+        parser.error("give session files to score, or --parity")
+
+    start, scored, failed = time.perf_counter(), 0, 0
+    for path in args.paths:
+        for session in load_sessions(path, args.exercise):
+            if session.get("exercise") is None and args.exercise:
+                session["exercise"] = args.exercise
+            try:
+                result = evaluate_request(session, per_frame=args.frames)
+                scored += 1
+            except ValueError as e:
+                result = {"id": session.get("id"), "error": str(e)}
+                failed += 1
+            print(json.dumps(result))
+    elapsed = time.perf_counter() - start
+    print(f"Scored {scored} sessions ({failed} failed) in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
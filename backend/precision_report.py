@@ -0,0 +1,150 @@
+"""
+Compares inference precision modes (INFERENCE_PRECISION) and Whisper decoding
+modes (WHISPER_DECODING) on a local clip set and writes a report with intent
+accuracy, transcription word error rate, p50/p95 latency and resident memory for
+each combination.
+
+    python precision_report.py clips/manifest.json --modes fp32 int8 bf16 --output precision_report.md
+    python precision_report.py clips/manifest.json --modes fp32 --decoding free command
+
+The manifest is a JSON list of clips, paths relative to the manifest:
+
+    [{"file": "skip.webm", "transcript": "skip", "intent": "SKIP_EXERCISE", "entity": null}, ...]
+
+Each combination runs in its own process, so models are loaded exactly as the server
+loads them and the memory figures aren't polluted by the other modes.
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import string
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref = reference.lower().translate(_PUNCTUATION).split()
+    hyp = hypothesis.lower().translate(_PUNCTUATION).split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def current_rss_mb():
+    """Resident set size of this process right now (Linux), in MB."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(manifest_path):
+    """Worker: evaluates the modes given by INFERENCE_PRECISION / WHISPER_DECODING and prints a JSON summary."""
+    import app
+
+    app.models.wait()
+    if not app.models.is_ready():
+        return {"error": app.models.status()}
+    rss_after_load = current_rss_mb()
+
+    with open(manifest_path) as f:
+        clips = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    client = app.app.test_client()
+    latencies, errors, intent_hits, entity_hits = [], [], 0, 0
+    for clip in clips:
+        with open(os.path.join(base_dir, clip["file"]), 'rb') as f:
+            audio_blob = f.read()
+        start = time.perf_counter()
+        result = client.post('/api/speech', data=audio_blob).get_json()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+        errors.append(word_error_rate(clip.get("transcript", ""), result.get("transcription", "")))
+        intent_hits += result.get("intent") == clip.get("intent")
+        entity_hits += result.get("entity") == clip.get("entity")
+
+    return {
+        "precision": app.INFERENCE_PRECISION,
+        "decoding": app.WHISPER_DECODING,
+        "clips": len(clips),
+        "intent_accuracy": intent_hits / len(clips),
+        "entity_accuracy": entity_hits / len(clips),
+        "wer": float(np.mean(errors)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "load_s": {name: status.get("load_s") for name, status in app.models.status().items()},
+        "rss_after_load_mb": round(rss_after_load, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def format_report(results):
+    lines = [
+        "| Mode | Decoding | Intent acc. | Entity acc. | WER | p50 (ms) | p95 (ms) | RSS after load (MB) | Peak RSS (MB) |",
+        "|---|---|---|---|---|---|---|---|---|"
+    ]
+    for (mode, decoding), result in results.items():
+        if "error" in result:
+            lines.append(f"| {mode} | {decoding} | failed: {result['error']} | | | | | | |")
+            continue
+        lines.append(
+            f"| {mode} | {decoding} | {result['intent_accuracy']:.1%} | {result['entity_accuracy']:.1%} | {result['wer']:.3f} "
+            f"| {result['p50_ms']:.0f} | {result['p95_ms']:.0f} | {result['rss_after_load_mb']:.0f} | {result['peak_rss_mb']:.0f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference precision and decoding modes on a local clip set.")
+    parser.add_argument('manifest', help="JSON manifest of clips with expected transcript/intent/entity")
+    parser.add_argument('--modes', nargs='+', default=["fp32", "int8", "bf16"])
+    parser.add_argument('--decoding', nargs='+', default=["free"], help="Whisper decoding modes: free, command")
+    parser.add_argument('--output', default='precision_report.md')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.manifest)))
+        return
+
+    results = {}
+    for mode, decoding in itertools.product(args.modes, args.decoding):
+        print(f"Evaluating {mode} with {decoding} decoding...")
+        env = dict(os.environ, INFERENCE_PRECISION=mode, WHISPER_DECODING=decoding)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), args.manifest, '--worker'],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+        )
+        output = completed.stdout.strip().splitlines()
+        try:
+            results[mode, decoding] = json.loads(output[-1])
+        except (IndexError, json.JSONDecodeError):
+            results[mode, decoding] = {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "no output"}
+
+    report = format_report(results)
+    with open(args.output, 'w') as f:
+        f.write(f"# Inference precision and decoding comparison\n\nClip set: {args.manifest}\n\n{report}\n\n")
+        f.write("```json\n" + json.dumps({f"{mode}/{decoding}": result for (mode, decoding), result in results.items()}, indent=2) + "\n```\n")
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
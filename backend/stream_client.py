@@ -0,0 +1,95 @@
+"""
+Replays audio files against the streaming speech endpoint at real-time speed and
+reports end-to-end command latency.
+
+    python stream_client.py clips/skip.webm clips/plank.wav --url ws://localhost:5000/api/speech/stream
+
+Latency is measured from the moment the end of speech in the file has been sent
+(found with the same energy VAD the server uses) to the moment the command
+arrives, i.e. what a user waits after they stop talking.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from simple_websocket import Client
+
+from audio import TARGET_SAMPLE_RATE, decode_audio, find_speech_bounds
+
+
+def replay(url, path, frame_ms=20, realtime=True, trailing_silence_ms=1500):
+    with open(path, 'rb') as f:
+        samples, _ = decode_audio(f.read())
+
+    # Keep "recording" after the clip like a live microphone would, so the server's
+    # end-of-speech detection decides when to answer
+    silence = np.zeros(int(TARGET_SAMPLE_RATE * trailing_silence_ms / 1000), dtype=np.float32)
+    samples = np.concatenate([samples, silence])
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+
+    bounds = find_speech_bounds(samples)
+    speech_end_s = (bounds[1] + 1) * bounds[2] / TARGET_SAMPLE_RATE if bounds else None
+
+    frame_length = int(TARGET_SAMPLE_RATE * frame_ms / 1000)
+    ws = Client.connect(url)
+    try:
+        ws.send(json.dumps({"sample_rate": TARGET_SAMPLE_RATE, "encoding": "pcm_s16le"}))
+        start = time.perf_counter()
+        result = None
+        sent = 0
+        while sent < len(pcm):
+            ws.send(pcm[sent:sent + frame_length].tobytes())
+            sent += frame_length
+            if realtime:
+                # Sleep until this frame's real-time position
+                delay = start + sent / TARGET_SAMPLE_RATE - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            result = ws.receive(timeout=0)
+            if result is not None:
+                break
+
+        if result is None:
+            ws.send(json.dumps({"event": "end"}))
+            result = ws.receive(timeout=30)
+        finished = time.perf_counter()
+    finally:
+        ws.close()
+
+    report = {
+        "file": path,
+        "result": json.loads(result) if result else None,
+        "audio_sent_ms": round(1000.0 * min(sent, len(pcm)) / TARGET_SAMPLE_RATE, 1),
+        "total_ms": round((finished - start) * 1000.0, 1),
+    }
+    if speech_end_s is not None and realtime:
+        report["latency_after_speech_ms"] = round((finished - start - speech_end_s) * 1000.0, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='+', help="Audio files to replay (any format the backend can decode)")
+    parser.add_argument('--url', default='ws://localhost:5000/api/speech/stream')
+    parser.add_argument('--frame-ms', type=int, default=20, help="Audio per WebSocket message")
+    parser.add_argument('--no-realtime', action='store_true', help="Send audio as fast as possible")
+    args = parser.parse_args()
+
+    latencies = []
+    for path in args.files:
+        report = replay(args.url, path, frame_ms=args.frame_ms, realtime=not args.no_realtime)
+        print(json.dumps(report))
+        if "latency_after_speech_ms" in report:
+            latencies.append(report["latency_after_speech_ms"])
+
+    if latencies:
+        print(json.dumps({
+            "clips": len(latencies),
+            "p50_latency_after_speech_ms": float(np.percentile(latencies, 50)),
+            "p95_latency_after_speech_ms": float(np.percentile(latencies, 95))
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionGate
+from inference_jobs import DEADLINE_EXCEEDED, SUPERSEDED, InferenceExecutor, InferenceJob, JobCancelled
+
+
+def admit_in_thread(executor, job, gate):
+    """Runs executor.admit(job, gate) on a thread; returns (thread, outcome dict)."""
+    outcome = {}
+
+    def target():
+        start = time.monotonic()
+        try:
+            outcome["admitted"] = executor.admit(job, gate)
+        except JobCancelled as e:
+            outcome["reason"] = e.reason
+        outcome["seconds"] = time.monotonic() - start
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def wait_for_waiting(gate, count, timeout=1.0):
+    end = time.monotonic() + timeout
+    while gate.status()["waiting"] != count and time.monotonic() < end:
+        time.sleep(0.005)
+    assert gate.status()["waiting"] == count
+
+
+def test_queued_job_gives_up_at_its_deadline():
+    gate = AdmissionGate(max_active=1, max_waiting=4)
+    executor = InferenceExecutor(1)
+    assert gate.try_enter()
+
+    thread, outcome = admit_in_thread(executor, InferenceJob(session="a", deadline_ms=100), gate)
+    thread.join(timeout=2.0)
+
+    assert outcome["reason"] == DEADLINE_EXCEEDED
+    assert outcome["seconds"] < 0.5
+    assert gate.status() == {"active": 1, "waiting": 0, "max_active": 1, "max_waiting": 4}
+    assert executor._sessions == {}
+    gate.leave()
+
+
+def test_superseded_job_leaves_the_queue_right_away():
+    gate = AdmissionGate(max_active=1, max_waiting=2)
+    executor = InferenceExecutor(1)
+    assert gate.try_enter()
+
+    older = InferenceJob(session="a", deadline_ms=10000)
+    thread, outcome = admit_in_thread(executor, older, gate)
+    wait_for_waiting(gate, 1)
+
+    # The newer command replaces the queued one, which stops waiting for a slot
+    newer = InferenceJob(session="a", deadline_ms=10000)
+    newer_thread, newer_outcome = admit_in_thread(executor, newer, gate)
+    thread.join(timeout=2.0)
+
+    assert outcome["reason"] == SUPERSEDED
+    assert outcome["seconds"] < 0.5
+    wait_for_waiting(gate, 1)
+    assert executor._sessions == {"a": newer}
+
+    gate.leave()
+    newer_thread.join(timeout=2.0)
+    assert newer_outcome["admitted"] is True
+    assert gate.status()["active"] == 1
+
+
+def test_full_queue_is_rejected_and_released():
+    gate = AdmissionGate(max_active=1, max_waiting=0)
+    executor = InferenceExecutor(1)
+    assert gate.try_enter()
+
+    job = InferenceJob(session="a", deadline_ms=10000)
+    assert executor.admit(job, gate) is False
+    assert executor._sessions == {}
+
+
+def test_run_releases_a_claimed_job_that_is_already_cancelled():
+    executor = InferenceExecutor(1)
+    job = InferenceJob(session="a")
+    executor.claim(job)
+    job.cancel(DEADLINE_EXCEEDED)
+
+    with pytest.raises(JobCancelled):
+        executor.run(job, lambda job: None)
+    assert executor._sessions == {}
@@ -0,0 +1,34 @@
+import numpy as np
+
+from audio import TARGET_SAMPLE_RATE, trim_silence
+
+
+def tone(seconds, amplitude=0.3, frequency=220.0):
+    t = np.arange(int(seconds * TARGET_SAMPLE_RATE)) / TARGET_SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def noise(seconds, amplitude=0.001):
+    rng = np.random.default_rng(0)
+    return rng.normal(0.0, amplitude, int(seconds * TARGET_SAMPLE_RATE)).astype(np.float32)
+
+
+def test_fully_voiced_clip_is_kept_whole():
+    clip = tone(1.0)
+    speech, stats = trim_silence(clip)
+    assert len(speech) == len(clip)
+    assert stats["dropped_ms"] == 0.0
+
+
+def test_padded_clip_is_trimmed_to_the_speech():
+    clip = np.concatenate([noise(1.0), tone(0.5), noise(1.0)])
+    speech, stats = trim_silence(clip)
+    # The tone plus at most VAD_PADDING_MS and a frame on each side
+    assert 500.0 <= stats["speech_ms"] <= 900.0
+    assert np.abs(speech).max() > 0.2
+
+
+def test_silent_clip_has_no_speech():
+    speech, stats = trim_silence(noise(1.0))
+    assert len(speech) == 0
+    assert stats["speech_ms"] == 0.0
@@ -0,0 +1,73 @@
+import re
+
+import numpy as np
+import pytest
+
+from command_decoding import CommandStoppingCriteria
+from commands import build_command_response, command_complete, load_golden_commands, match_command
+
+EOS = 0
+
+
+class StubTokenizer:
+    """Word-level stand-in for the Whisper tokenizer: one token per word or punctuation mark."""
+
+    eos_token_id = EOS
+
+    def __init__(self):
+        self.vocabulary = {EOS: ""}
+
+    def encode(self, text):
+        ids = []
+        for piece in re.findall(r"\s*[\w']+|\s*[^\w\s]", text):
+            token_id = next((i for i, p in self.vocabulary.items() if p == piece), None)
+            if token_id is None:
+                token_id = len(self.vocabulary)
+                self.vocabulary[token_id] = piece
+            ids.append(token_id)
+        return ids
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(self.vocabulary[i] for i in ids if not (skip_special_tokens and i == EOS))
+
+
+def decode_with_early_stop(text, tokenizer, criteria):
+    """What a stub model that writes `text` token by token returns under the stopping criteria."""
+    ids = tokenizer.encode(text) + [EOS]
+    for length in range(1, len(ids) + 1):
+        if ids[length - 1] == EOS:
+            break
+        if criteria(np.array([ids[:length]]), None):
+            return tokenizer.decode(ids[:length])
+    return tokenizer.decode(ids)
+
+
+def response(text):
+    match = match_command(text)
+    return build_command_response(match) if match.matched else None
+
+
+def transcriptions():
+    # Whisper usually capitalizes and closes the sentence
+    for case in load_golden_commands():
+        text = case["text"]
+        yield text
+        yield text[:1].upper() + text[1:] + "."
+    yield "Squats, then I need a break."
+
+
+@pytest.mark.parametrize("text", list(transcriptions()))
+def test_early_stop_never_changes_the_command(text):
+    tokenizer = StubTokenizer()
+    decoded = decode_with_early_stop(text, tokenizer, CommandStoppingCriteria(tokenizer))
+    if decoded != text:
+        # Stopping early may only drop what follows a whole command sentence
+        assert response(decoded)["intent"] == response(text)["intent"]
+        assert text.startswith(decoded)
+
+
+def test_keyword_hits_inside_longer_text_do_not_stop():
+    assert not command_complete("Squats,")
+    assert not command_complete("Squats, then I need")
+    assert command_complete("Next exercise.")
+    assert command_complete(" Stop!")
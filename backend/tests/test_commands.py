@@ -0,0 +1,7 @@
+from commands import load_golden_commands, verify_golden_commands
+
+
+def test_golden_commands_match():
+    failures = verify_golden_commands()
+    assert load_golden_commands()
+    assert failures == [], f"{len(failures)} golden commands disagree, e.g. {failures[:3]}"
@@ -0,0 +1,7 @@
+from pose import verify_parity
+
+
+def test_pose_rules_match_the_browser():
+    checked, mismatches = verify_parity()
+    assert checked > 0
+    assert mismatches == [], f"{len(mismatches)} of {checked} frames differ, e.g. {mismatches[:3]}"
@@ -0,0 +1,61 @@
+import threading
+
+from admission import AdmissionGate
+from models import READY, ModelManager
+from tiering import FULL, LITE, TierRouter
+
+STAGES = {
+    "transcriber": {"full": "transcriber", "lite": "transcriber_lite", "rules": "transcriber_lite"},
+    "classifier": {"full": "classifier", "lite": "classifier_lite", "rules": None}
+}
+
+
+def make_router(lite_ready=(), **kwargs):
+    models = ModelManager()
+    blocked = threading.Event()
+    for name in ("transcriber", "classifier"):
+        models.register(name, lambda name=name: name)
+    for name in ("transcriber_lite", "classifier_lite"):
+        # Lite models that should not be ready block in their loader
+        loader = (lambda name=name: name) if name in lite_ready else (lambda: blocked.wait() and None)
+        models.register(name, loader, lazy=True, size_mb=10)
+    assert models.load_all(warmup=False)
+    models.load(*lite_ready, warmup=False)
+    assert models.wait(*lite_ready, timeout=5.0)
+    gate = AdmissionGate(max_active=1, max_waiting=8)
+    return TierRouter(models, gate, STAGES, queue_depth=1, **kwargs), models, gate
+
+
+def test_lite_level_falls_back_to_the_full_classifier():
+    router, models, gate = make_router(lite_ready=("transcriber_lite",))
+    gate.waiting = 1  # one request queued: lite pressure
+
+    tier = router.select()
+    assert tier.transcriber == "transcriber_lite"
+    assert tier.classifier == "classifier"
+    assert tier.name == LITE
+    router.release(tier)
+
+
+def test_models_in_use_are_not_unloaded():
+    router, models, gate = make_router(lite_ready=("transcriber_lite", "classifier_lite"), idle_unload_s=0.0)
+    gate.waiting = 1
+
+    tier = router.select()
+    assert tier.classifier == "classifier_lite"
+    assert models.unload("transcriber_lite") == 0
+    router._last_sweep = 0.0
+    router._sweep_idle()
+    assert models.state("transcriber_lite") == READY
+
+    router.release(tier)
+    assert models.unload("transcriber_lite") == 10
+
+
+def test_no_pressure_uses_the_full_tier():
+    router, models, gate = make_router()
+    tier = router.select()
+    assert tier.name == FULL
+    assert tier.pinned == ["transcriber", "classifier"]
+    router.release(tier)
+    assert not models.is_pinned("transcriber")
@@ -0,0 +1,217 @@
+"""
+Load-adaptive model tiers for the speech pipeline.
+
+Each stage has a full model and a small one registered in the ModelManager:
+
+    stage         full (always loaded)      lite (loaded on demand)
+    transcriber   whisper-base.en           whisper-tiny.en
+    classifier    bart-large-mnli           sentence embedding (or none: rules only)
+
+For every request the router measures pressure from the admission queue depth
+and the p95 of recent request latencies, and picks a tier:
+
+    full   no pressure: full models for both stages
+    lite   busy: small transcriber and small classifier
+    rules  overloaded: small transcriber, classifier fallback skipped (the rule
+           matcher alone decides; rule misses come back UNKNOWN)
+
+A stage falls back to the next model that is ready when its preferred one isn't
+loaded yet (its load is started in the background); the lite tier only drops the
+classifier when no classifier is ready at all. The models picked for a request
+are pinned until it is done, so they are never unloaded under it. Lite models are only loaded
+while they fit in the RAM budget, evicting other idle lite models if needed,
+and are unloaded again once they have been idle for a while.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from models import PENDING
+
+logger = logging.getLogger(__name__)
+
+FULL, LITE, RULES = "full", "lite", "rules"
+TIER_LEVELS = (FULL, LITE, RULES)
+
+
+class Tier:
+    """
+    The models one request is served with: a transcriber name and a classifier
+    (None: rules only). `pinned` lists the models kept loaded until release().
+    """
+
+    def __init__(self, name, transcriber, classifier, pinned=()):
+        self.name = name
+        self.transcriber = transcriber
+        self.classifier = classifier
+        self.pinned = list(pinned)
+
+
+class LatencyWindow:
+    """Request latencies of the last `seconds` (at most `max_samples` of them)."""
+
+    def __init__(self, seconds=30.0, max_samples=512):
+        self.seconds = seconds
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_seconds):
+        with self._lock:
+            self._samples.append((time.monotonic(), latency_seconds))
+
+    def percentile(self, q):
+        """The q-th percentile in seconds, or None without recent samples."""
+        cutoff = time.monotonic() - self.seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            if not self._samples:
+                return None
+            return float(np.percentile([latency for _, latency in self._samples], q))
+
+
+class TierRouter:
+    """
+    Picks the tier for each request and keeps the lite models within the RAM budget.
+
+    `stages` maps each stage to its model names per level, most accurate first:
+        {"transcriber": {"full": "transcriber", "lite": "transcriber_lite", "rules": "transcriber_lite"},
+         "classifier":  {"full": "classifier", "lite": "classifier_lite", "rules": None}}
+    """
+
+    def __init__(self, models, gate, stages, queue_depth=4, p95_ms=2000.0, ram_budget_mb=0,
+                 idle_unload_s=300.0, enabled=True, window=None):
+        self.models = models
+        self.gate = gate
+        self.stages = stages
+        self.queue_depth = max(1, int(queue_depth))
+        self.p95_target = p95_ms / 1000.0
+        self.ram_budget_mb = ram_budget_mb
+        self.idle_unload_s = idle_unload_s
+        self.enabled = enabled
+        self.latencies = window or LatencyWindow()
+        self._full_models = {levels[FULL] for levels in stages.values()}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._over_budget = set()
+
+    def observe(self, latency_seconds):
+        """Feeds the end-to-end latency of a served request into the rolling p95."""
+        self.latencies.observe(latency_seconds)
+
+    def pressure(self):
+        """0 (full), 1 (lite) or 2 (rules), from the queue depth and the recent p95."""
+        if not self.enabled:
+            return 0
+        waiting = self.gate.status()["waiting"]
+        p95 = self.latencies.percentile(95)
+        if waiting >= 2 * self.queue_depth or (p95 is not None and p95 > 2 * self.p95_target):
+            return 2
+        if waiting >= self.queue_depth or (p95 is not None and p95 > self.p95_target):
+            return 1
+        return 0
+
+    def level(self):
+        """The name of the tier the current pressure calls for, without picking any models."""
+        return TIER_LEVELS[self.pressure()]
+
+    def select(self):
+        """
+        The Tier a new request should be served with. Its models stay pinned (so
+        they can't be unloaded mid-request) until the caller passes it to release().
+        """
+        level = self.pressure()
+        self._sweep_idle()
+
+        pinned = []
+        transcriber = self._pick("transcriber", level, pinned)
+        classifier_name = self._pick("classifier", level, pinned)
+        classifier = self.models.get(classifier_name) if classifier_name else None
+
+        if classifier is None:
+            name = RULES
+        elif transcriber in self._full_models and classifier_name in self._full_models:
+            name = FULL
+        else:
+            name = LITE
+        return Tier(name, transcriber, classifier, pinned)
+
+    def release(self, tier):
+        """Unpins the models of a Tier returned by select() once its request is done."""
+        for name in tier.pinned:
+            self.models.unpin(name)
+        tier.pinned = []
+
+    def _pick(self, stage, level, pinned):
+        # The stage's model for this level, or the closest ready one: lighter
+        # levels first, the full model as the last resort. A stage that may be
+        # skipped (None) at a lighter level is only skipped when no model is ready.
+        levels = self.stages[stage]
+        if levels[TIER_LEVELS[level]] is None:
+            return None
+        candidates = [levels[tier] for tier in TIER_LEVELS[level:]] + [levels[FULL]]
+        for name in candidates:
+            if name is None:
+                continue
+            if self.models.pin(name):
+                pinned.append(name)
+                return name
+            self._request_load(name)
+        return None if None in candidates else levels[FULL]
+
+    def _request_load(self, name):
+        with self._lock:
+            if self.models.state(name) != PENDING:
+                return
+            needed = self.models.size_mb(name) or 0
+            if self.ram_budget_mb:
+                self._evict_for(name, needed)
+                if self.models.loaded_mb() + needed > self.ram_budget_mb:
+                    if name not in self._over_budget:
+                        self._over_budget.add(name)
+                        logger.warning("Not loading model '%s' (%.0f MB): it would exceed the RAM budget (%.0f of %.0f MB in use).",
+                                       name, needed, self.models.loaded_mb(), self.ram_budget_mb)
+                    return
+            self._over_budget.discard(name)
+            logger.info("Loading lite model '%s' under load.", name)
+            self.models.load(name)
+
+    def _lite_models(self):
+        return {name for levels in self.stages.values() for name in levels.values()
+                if name is not None and name not in self._full_models}
+
+    def _evict_for(self, name, needed):
+        # Unload lite models that went unused the longest until `needed` MB fits
+        idle = sorted(
+            (self.models.idle_seconds(other) or 0, other) for other in self._lite_models() - {name}
+            if self.models.is_ready(other) and not self.models.is_pinned(other)
+            and (self.models.idle_seconds(other) or 0) > 1.0
+        )
+        while idle and self.models.loaded_mb() + needed > self.ram_budget_mb:
+            _, other = idle.pop()
+            self.models.unload(other)
+
+    def _sweep_idle(self):
+        # Unload lite models nobody used for idle_unload_s (checked every few seconds)
+        now = time.monotonic()
+        if now - self._last_sweep < 5.0:
+            return
+        self._last_sweep = now
+        for name in self._lite_models():
+            idle = self.models.idle_seconds(name)
+            if (self.models.is_ready(name) and not self.models.is_pinned(name)
+                    and idle is not None and idle > self.idle_unload_s):
+                self.models.unload(name)
+
+    def status(self):
+        p95 = self.latencies.percentile(95)
+        return {
+            "enabled": self.enabled,
+            "pressure": self.level(),
+            "p95_ms": None if p95 is None else round(p95 * 1000.0, 1),
+            "loaded_mb": round(self.models.loaded_mb(), 1),
+            "ram_budget_mb": self.ram_budget_mb or None
+        }
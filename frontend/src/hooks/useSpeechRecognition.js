@@ -2,6 +2,12 @@ import { useState, useRef } from 'react';
 import axios from 'axios';
 import { API_ENDPOINTS } from '../config/api';
 
+// How long the backend may spend on one command before answering 504
+const COMMAND_DEADLINE_MS = 10000;
+
+// Identifies this tab to the backend, which keeps one command per session in flight
+const createSessionId = () => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
 /**
  * A custom React hook to manage the entire speech recognition flow.
  * It handles microphone access, recording, sending audio to the backend,
@@ -16,6 +22,9 @@ export const useSpeechRecognition = () => {
   // Refs to hold the MediaRecorder instance and the recorded audio chunks
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
+  // Session id sent with every command, and the AbortController of the request in flight
+  const sessionIdRef = useRef(createSessionId());
+  const pendingRequestRef = useRef(null);
 
   /**
    * The main function to start the voice command process.
@@ -43,16 +52,40 @@ export const useSpeechRecognition = () => {
         // Combine all recorded audio chunks into a single Blob
         const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
         
+        // A newer command replaces one that is still being processed
+        if (pendingRequestRef.current) {
+          pendingRequestRef.current.abort();
+        }
+        const controller = new AbortController();
+        pendingRequestRef.current = controller;
+
         try {
           // Send the audio blob to our backend API endpoint
           const response = await axios.post(API_ENDPOINTS.speech, audioBlob, {
-            headers: { 'Content-Type': 'application/octet-stream' },
+            headers: {
+              'Content-Type': 'application/octet-stream',
+              'X-Client-Session': sessionIdRef.current,
+              'X-Request-Deadline-Ms': String(COMMAND_DEADLINE_MS)
+            },
+            timeout: COMMAND_DEADLINE_MS + 2000,
+            signal: controller.signal
           });
           // On success, update the state with the structured command from the AI
           setCommand(response.data); 
         } catch (error) {
-          console.error('Voice command error:', error.response?.data?.error || error.message);
-          setCommand({ intent: "ERROR", transcription: 'Error processing command.' });
+          // Replaced by a newer command (aborted here, or 409 from the backend): the
+          // newer command reports its own result
+          const replaced = axios.isCancel(error) || error.response?.status === 409;
+          if (error.response?.status === 504) {
+            setCommand({ intent: "ERROR", transcription: 'Command took too long. Please try again.' });
+          } else if (!replaced) {
+            console.error('Voice command error:', error.response?.data?.error || error.message);
+            setCommand({ intent: "ERROR", transcription: 'Error processing command.' });
+          }
+        } finally {
+          if (pendingRequestRef.current === controller) {
+            pendingRequestRef.current = null;
+          }
         }
         
         // Clean up: turn off the microphone light and release the track
@@ -0,0 +1,190 @@
+/**
+ * Pose Evaluator Parity Fixture Generator
+ *
+ * Runs the browser form-evaluation rules in src/utils/poseEvaluator.js over
+ * seeded synthetic keypoint sessions and writes every frame's result to
+ * backend/pose_parity.json. The backend pose engine (backend/pose.py) replays
+ * the same sessions and must reproduce these results exactly:
+ *
+ *   npm run evaluation:pose-parity     (regenerate after changing a rule)
+ *   cd ../backend && python pose.py --parity
+ */
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const EVALUATOR_PATH = path.join(__dirname, '../../utils/poseEvaluator.js');
+const FIXTURE_PATH = path.join(__dirname, '../../../../backend/pose_parity.json');
+
+const PARITY_CONFIG = {
+  randomSeed: 42,
+  sessionsPerExercise: 3,
+  framesPerSession: 40,
+  lowScoreRate: 0.08
+};
+
+// MoveNet / COCO keypoint order, as returned by @tensorflow-models/pose-detection
+const KEYPOINT_NAMES = [
+  'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+  'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+  'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+  'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
+];
+
+// Poses in a 640x480 frame that sessions start from and drift around
+const STANDING_POSE = [
+  [320, 80], [310, 70], [330, 70], [300, 75], [340, 75],
+  [280, 130], [360, 130], [260, 200], [380, 200],
+  [250, 260], [390, 260], [295, 260], [345, 260],
+  [295, 350], [345, 350], [295, 440], [345, 440]
+];
+const LYING_POSE = [
+  [120, 300], [110, 292], [112, 296], [125, 290], [128, 298],
+  [170, 300], [174, 306], [170, 350], [174, 356],
+  [170, 400], [174, 406], [320, 300], [324, 306],
+  [420, 300], [424, 306], [520, 300], [524, 306]
+];
+// Lying face down with the arms reaching forward past the head
+const PRONE_POSE = [
+  [120, 300], [110, 292], [112, 296], [125, 290], [128, 298],
+  [170, 300], [174, 306], [115, 302], [119, 308],
+  [60, 305], [64, 310], [320, 300], [324, 306],
+  [420, 300], [424, 306], [520, 300], [524, 306]
+];
+
+// Base pose and how far keypoints wander (1 = up to ~100px) for each exercise
+const EXERCISE_MOTION = {
+  'Push-up': [LYING_POSE, 0.4],
+  'Squat': [STANDING_POSE, 1],
+  'Bridge': [LYING_POSE, 1],
+  'Lunges': [STANDING_POSE, 1],
+  'High Knees': [STANDING_POSE, 1.2],
+  'Superman': [PRONE_POSE, 0.6],
+  'Plank': [LYING_POSE, 0.3],
+  'Wall-sit': [STANDING_POSE, 1],
+  'Bird-dog': [LYING_POSE, 0.3]
+};
+
+const REP_EXERCISES = ['Push-up', 'Squat', 'Bridge', 'Lunges', 'High Knees', 'Superman'];
+const HOLD_EXERCISES = ['Plank', 'Wall-sit', 'Bird-dog'];
+const INITIAL_STATES = [[null, 0], ['down', 3], ['', 1]];
+
+// Same generator as academicEvaluation.js, so fixtures are reproducible
+class SeededRandom {
+  constructor(seed) {
+    this.seed = seed;
+  }
+
+  next() {
+    this.seed = (this.seed * 9301 + 49297) % 233280;
+    return this.seed / 233280;
+  }
+
+  range(min, max) {
+    return min + (max - min) * this.next();
+  }
+}
+
+function loadEvaluators() {
+  // poseEvaluator.js is an ES module written for the browser bundle; evaluate it
+  // as a plain script with its exports exposed and its console logging silenced
+  const source = fs.readFileSync(EVALUATOR_PATH, 'utf8').replace(/^export /gm, '');
+  const context = { console: { log() {} }, Math };
+  vm.runInNewContext(source, context);
+  return {
+    'Push-up': context.evaluatePushup,
+    'Squat': context.evaluateSquat,
+    'Bridge': context.evaluateBridge,
+    'Lunges': context.evaluateLunge,
+    'High Knees': context.evaluateHighKnees,
+    'Superman': context.evaluateSuperman,
+    'Plank': context.evaluatePlank,
+    'Wall-sit': context.evaluateWallSit,
+    'Bird-dog': context.evaluateBirdDog
+  };
+}
+
+function generateSession(rng, exercise, frames) {
+  // Each keypoint drifts around the base pose on its own slow oscillation, wide
+  // enough for joint angles to sweep through every rule threshold
+  const [basePose, spread] = EXERCISE_MOTION[exercise];
+  const motion = basePose.map(() => ({
+    ax: spread * rng.range(10, 90), ay: spread * rng.range(10, 110),
+    px: rng.range(10, 30), py: rng.range(10, 30),
+    fx: rng.range(0, 2 * Math.PI), fy: rng.range(0, 2 * Math.PI)
+  }));
+
+  const session = [];
+  for (let t = 0; t < frames; t++) {
+    session.push(basePose.map(([x, y], i) => {
+      const m = motion[i];
+      const jitter = () => rng.range(-3, 3);
+      const px = x + m.ax * Math.sin((2 * Math.PI * t) / m.px + m.fx) + jitter();
+      const py = y + m.ay * Math.sin((2 * Math.PI * t) / m.py + m.fy) + jitter();
+      // Mostly confident detections, with occasional dropouts and exact 0.5 scores
+      let score = rng.range(0.55, 0.99);
+      const roll = rng.next();
+      if (roll < PARITY_CONFIG.lowScoreRate) score = rng.range(0.05, 0.5);
+      else if (roll < PARITY_CONFIG.lowScoreRate + 0.01) score = 0.5;
+      // Whole pixels and whole-percent scores keep the fixture compact
+      return [Math.round(px), Math.round(py), Math.round(score * 100)];
+    }));
+  }
+  return session;
+}
+
+function toKeypoints(frame) {
+  return frame.map(([x, y, scorePercent], i) => ({ x, y, score: scorePercent / 100, name: KEYPOINT_NAMES[i] }));
+}
+
+function generateFixture() {
+  const rng = new SeededRandom(PARITY_CONFIG.randomSeed);
+  const evaluators = loadEvaluators();
+  const sessions = [];
+
+  // Feedback [text, color] pairs are stored once and referenced by index
+  const messages = [];
+  const messageIndex = (feedback, feedbackColor) => {
+    let index = messages.findIndex(([text, color]) => text === feedback && color === feedbackColor);
+    if (index < 0) {
+      index = messages.push([feedback, feedbackColor]) - 1;
+    }
+    return index;
+  };
+
+  [...REP_EXERCISES, ...HOLD_EXERCISES].forEach(exercise => {
+    const isRepExercise = REP_EXERCISES.includes(exercise);
+    for (let s = 0; s < PARITY_CONFIG.sessionsPerExercise; s++) {
+      const keypoints = generateSession(rng, exercise, PARITY_CONFIG.framesPerSession);
+      const [initialStage, initialReps] = INITIAL_STATES[s % INITIAL_STATES.length];
+      let stage = initialStage;
+      let repCount = initialReps;
+
+      // Frames are evaluated one by one, threading stage and rep count through
+      // exactly as VideoFeed.js does
+      const expected = keypoints.map(frame => {
+        const result = evaluators[exercise](toKeypoints(frame), stage, repCount);
+        if (isRepExercise) {
+          stage = result.stage;
+          repCount = result.repCount;
+          return [result.stage, result.repCount, messageIndex(result.feedback, result.feedbackColor)];
+        }
+        return [result.isCorrectForm, messageIndex(result.feedback, result.feedbackColor)];
+      });
+
+      // Stored as [x, y, score percent] rows per frame, flattened
+      sessions.push({ exercise, stage: initialStage, repCount: initialReps, keypoints: keypoints.map(frame => frame.flat()), expected });
+    }
+  });
+
+  return { keypointNames: KEYPOINT_NAMES, config: PARITY_CONFIG, messages, sessions };
+}
+
+module.exports = { generateFixture, loadEvaluators, KEYPOINT_NAMES };
+
+if (require.main === module) {
+  const fixture = generateFixture();
+  fs.writeFileSync(FIXTURE_PATH, JSON.stringify(fixture) + '\n');
+  const frames = fixture.sessions.reduce((total, session) => total + session.expected.length, 0);
+  console.log(`Wrote ${fixture.sessions.length} sessions (${frames} frames) to ${path.relative(process.cwd(), FIXTURE_PATH)}`);
+}